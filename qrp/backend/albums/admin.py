@@ -17,6 +17,11 @@ from .models import (
     StudioContactInfo,
     SocialLink,
     ContactMessage,
+    UploadJob,
+    UploadJobFile,
+    MediaAsset,
+    PendingMediaDeletion,
+    OutboxEmail,
 )
 
 
@@ -236,3 +241,49 @@ class ContactMessageAdmin(admin.ModelAdmin):
             'fields': ('status', 'ip_address', 'created_at', 'updated_at')
         }),
     )
+
+
+
+class UploadJobFileInline(admin.TabularInline):
+    model = UploadJobFile
+    extra = 0
+    fields = ('index', 'original_name', 'status', 'error', 'result')
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(UploadJob)
+class UploadJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'owner', 'status', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('owner', 'kind', 'target_id', 'output_dir', 'error', 'created_at', 'updated_at', 'finished_at')
+    inlines = [UploadJobFileInline]
+
+
+@admin.register(MediaAsset)
+class MediaAssetAdmin(admin.ModelAdmin):
+    list_display = ('path', 'ref_count', 'size_display', 'updated_at')
+    search_fields = ('path',)
+    readonly_fields = ('path', 'ref_count', 'size', 'created_at', 'updated_at')
+
+    @admin.display(description='Size')
+    def size_display(self, obj):
+        return _format_bytes(obj.size)
+
+
+@admin.register(PendingMediaDeletion)
+class PendingMediaDeletionAdmin(admin.ModelAdmin):
+    list_display = ('path', 'attempts', 'next_run_at', 'created_at')
+    search_fields = ('path',)
+    readonly_fields = ('path', 'attempts', 'last_error', 'created_at')
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'attempts', 'next_run_at', 'created_at')
+    search_fields = ('subject',)
+    readonly_fields = ('subject', 'body', 'html_body', 'from_email', 'to', 'attempts', 'last_error', 'created_at')
+
+    @admin.display(description='To')
+    def recipients(self, obj):
+        return ', '.join(obj.to)
@@ -8,3 +8,4 @@ class AlbumsConfig(AppConfig):
     def ready(self):
         # Register signal handlers
         from . import signals  # noqa: F401
+        from . import studio_cache  # noqa: F401
@@ -0,0 +1,323 @@
+"""Streaming ZIP archives of album photos.
+
+The archive is produced incrementally: zipfile writes into a small in-memory
+sink that is drained after every chunk, so memory stays constant regardless
+of album size. Formats that are already compressed are stored as-is instead
+of being deflated a second time.
+
+Complete archives are also cached under MEDIA_ROOT/archives, named after the
+album id and a fingerprint of its photo set. A cached file is only served
+while the fingerprint still matches, and it is rebuilt in the background
+once the album's photos stop changing. Each gunicorn worker runs its own
+builder, so a build first takes a short-lived lock in the shared cache;
+a worker that finds the archive being built elsewhere skips it.
+
+With remote media storage (MEDIA_STORAGE=s3) photos are read through
+default_storage while streaming, and no archive is cached: MEDIA_ROOT is
+not shared between app nodes there.
+"""
+import glob
+import hashlib
+import logging
+import os
+import posixpath
+import threading
+import time
+import zipfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+
+from . import media_storage
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = 'archives'
+
+
+CHUNK_SIZE = 256 * 1024
+
+# Already-compressed formats: deflating them again costs CPU for ~0% gain.
+STORED_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.heic',
+    '.mp4', '.m4v', '.mov', '.webm', '.zip',
+}
+
+
+class _StreamSink:
+    """Write-only, non-seekable file object that buffers zipfile output.
+
+    zipfile detects the missing seek() and switches to streaming mode (data
+    descriptors after each entry), which is what makes single-pass output
+    possible.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def compression_for(name: str) -> int:
+    if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _open_local(path, arcname, chunk_size):
+    zinfo = zipfile.ZipInfo.from_file(path, arcname)
+    src = open(path, 'rb')
+    return zinfo, src, src.read(chunk_size)
+
+
+def _open_stored(name, arcname, chunk_size):
+    zinfo = zipfile.ZipInfo(arcname, time.localtime()[:6])
+    src = default_storage.open(name, 'rb')
+    try:
+        # Remote storages open lazily; a missing object only fails on read.
+        return zinfo, src, src.read(chunk_size)
+    except BaseException:
+        src.close()
+        raise
+
+
+def iter_zip(entries, chunk_size=CHUNK_SIZE, from_storage=False):
+    """Yield a ZIP archive of (path, arcname) entries chunk by chunk.
+
+    Paths are absolute file paths, or storage names read through
+    default_storage when ``from_storage`` is set. Zip64 extensions are used
+    automatically for large entries and archives. Entries whose file
+    disappeared in the meantime are skipped.
+    """
+    open_entry = _open_stored if from_storage else _open_local
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, 'w', allowZip64=True) as zip_file:
+        for path, arcname in entries:
+            try:
+                zinfo, src, chunk = open_entry(path, arcname, chunk_size)
+            except OSError as exc:
+                logger.warning("Skipping %s in album archive: %s", path, exc)
+                continue
+            zinfo.compress_type = compression_for(arcname)
+
+            with src, zip_file.open(zinfo, 'w') as dest:
+                while chunk:
+                    dest.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+                    chunk = src.read(chunk_size)
+
+            data = sink.drain()
+            if data:
+                yield data
+
+    # Central directory, written when the ZipFile closes.
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def media_path_from_url(url: str) -> str | None:
+    """Absolute MEDIA_ROOT path for a stored photo URL, or None if outside it."""
+    from .media_registry import path_from_url
+
+    relative_path = path_from_url(url)
+    if not relative_path:
+        return None
+
+    media_root = os.path.abspath(settings.MEDIA_ROOT)
+    file_path = os.path.abspath(os.path.join(media_root, relative_path))
+    if not file_path.startswith(media_root + os.sep):
+        return None
+    return file_path
+
+
+def album_archive_entries(photo_urls, from_storage=False):
+    """(path, arcname) pairs for the given photo URLs, with unique arcnames.
+
+    Paths are absolute MEDIA_ROOT paths, or storage names for iter_zip(...,
+    from_storage=True).
+    """
+    from .media_registry import path_from_url
+
+    used_names = set()
+    for url in photo_urls:
+        file_path = path_from_url(url) if from_storage else media_path_from_url(url)
+        if not file_path:
+            logger.warning("Skipping %s in album archive: not a stored media URL", url)
+            continue
+        if not from_storage and not os.path.isfile(file_path):
+            logger.warning("Skipping %s in album archive: file is missing", file_path)
+            continue
+
+        arcname = posixpath.basename(file_path) if from_storage else os.path.basename(file_path)
+        if arcname in used_names:
+            stem, extension = os.path.splitext(arcname)
+            counter = 1
+            while f"{stem}-{counter}{extension}" in used_names:
+                counter += 1
+            arcname = f"{stem}-{counter}{extension}"
+        used_names.add(arcname)
+
+        yield file_path, arcname
+
+
+def archive_fingerprint(photo_rows) -> str:
+    """Fingerprint of an album's photo set from ordered (id, url) rows."""
+    digest = hashlib.sha1()
+    for photo_id, url in photo_rows:
+        digest.update(f"{photo_id}:{url}\n".encode())
+    return digest.hexdigest()[:20]
+
+
+def cached_archive_path(album_id, fingerprint: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, ARCHIVE_DIR, f"{album_id}-{fingerprint}.zip")
+
+
+def album_photo_rows(album_id):
+    from .models import Photo
+
+    return list(
+        Photo.objects.filter(album_id=album_id).order_by('order', 'id').values_list('id', 'url')
+    )
+
+
+def remove_album_archives(album_id, keep: str | None = None) -> None:
+    pattern = os.path.join(settings.MEDIA_ROOT, ARCHIVE_DIR, f"{album_id}-*.zip")
+    for path in glob.glob(pattern):
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError as exc:
+            logger.warning("Unable to remove cached archive %s: %s", path, exc)
+
+
+def build_album_archive(album_id) -> str | None:
+    """Write the cached archive for an album's current photo set.
+
+    Returns the archive path, or None when the album is gone, has downloads
+    disabled or has no photos, or when another process is building it.
+    """
+    from .models import Album
+
+    album = Album.objects.filter(pk=album_id).only('id', 'allow_downloads').first()
+    rows = album_photo_rows(album_id) if album and album.allow_downloads else []
+    if not rows:
+        remove_album_archives(album_id)
+        return None
+
+    fingerprint = archive_fingerprint(rows)
+    path = cached_archive_path(album_id, fingerprint)
+    if not os.path.exists(path):
+        lock_key = f"album_archive:building:{album_id}:{fingerprint}"
+        lock_timeout = getattr(settings, 'ALBUM_ARCHIVE_BUILD_LOCK_SECONDS', 30 * 60)
+        if not cache.add(lock_key, os.getpid(), timeout=lock_timeout):
+            logger.debug("Archive for album %s is being built elsewhere", album_id)
+            return None
+        try:
+            # Another process may have finished it between our check and the lock.
+            if not os.path.exists(path):
+                _write_archive(path, rows)
+        finally:
+            cache.delete(lock_key)
+
+    remove_album_archives(album_id, keep=path)
+    return path
+
+
+def _write_archive(path: str, rows) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write under a temporary name so a partial file is never served.
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as out:
+            for chunk in iter_zip(album_archive_entries(url for _, url in rows)):
+                out.write(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+_due_builds: dict = {}
+_builder_condition = threading.Condition()
+_builder_started = False
+
+
+def _ensure_builder() -> None:
+    """Start a single background thread that builds archives once they are due."""
+    global _builder_started
+
+    if _builder_started:
+        return
+
+    def worker():
+        while True:
+            with _builder_condition:
+                while not _due_builds:
+                    _builder_condition.wait()
+                album_id, due = min(_due_builds.items(), key=lambda item: item[1])
+                delay = due - time.monotonic()
+                if delay > 0:
+                    _builder_condition.wait(timeout=delay)
+                    continue
+                del _due_builds[album_id]
+
+            try:
+                build_album_archive(album_id)
+            except Exception:
+                logger.exception("Building cached archive for album %s failed", album_id)
+            finally:
+                close_old_connections()
+
+    thread = threading.Thread(target=worker, name='album-archive-builder', daemon=True)
+    thread.start()
+    _builder_started = True
+
+
+def schedule_album_archive(album_id, postpone: bool = True) -> None:
+    """(Re)build the album's cached archive once its photo set has settled.
+
+    With ``postpone`` (photo-set changes) every call pushes the build back by
+    ALBUM_ARCHIVE_SETTLE_SECONDS, so a burst of edits results in a single
+    build. Downloads pass ``postpone=False``: they only schedule a build when
+    none is pending, so frequent downloads can't keep delaying it.
+    """
+    if not getattr(settings, 'ALBUM_ARCHIVE_CACHE', True) or not media_storage.is_local():
+        return
+
+    settle = getattr(settings, 'ALBUM_ARCHIVE_SETTLE_SECONDS', 60)
+    with _builder_condition:
+        _ensure_builder()
+        due = time.monotonic() + settle
+        if postpone:
+            _due_builds[album_id] = due
+        else:
+            _due_builds.setdefault(album_id, due)
+        _builder_condition.notify()
+
+
+def invalidate_album_archive(album_id, rebuild: bool = True) -> None:
+    """Drop cached archives for an album after its photo set changed."""
+    remove_album_archives(album_id)
+    if rebuild:
+        schedule_album_archive(album_id)
@@ -0,0 +1,11 @@
+"""Client address lookup shared by the like and contact endpoints."""
+
+
+def get_client_ip(request) -> str | None:
+    """The client's IP: first X-Forwarded-For hop (set by nginx), else REMOTE_ADDR."""
+    if request is None:
+        return None
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0]
+    return request.META.get('REMOTE_ADDR')
@@ -0,0 +1,181 @@
+"""Process-wide image processing engine.
+
+CPU-heavy ImageProcessor work (decode, resize, WebP encode) is submitted to a
+single ProcessPoolExecutor per server process instead of being run on request
+threads. The pool is sized to the core count and the number of in-flight jobs
+is bounded, so one large upload cannot monopolise the worker and concurrent
+requests share the same capacity.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from .image_processor import ImageProcessor
+
+logger = logging.getLogger(__name__)
+
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_slots: threading.BoundedSemaphore | None = None
+
+
+def _configured_workers() -> int:
+    workers = getattr(settings, 'IMAGE_ENGINE_WORKERS', None)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return max(0, int(workers))
+
+
+def _get_slots() -> threading.BoundedSemaphore:
+    global _slots
+
+    if _slots is None:
+        with _executor_lock:
+            if _slots is None:
+                max_pending = getattr(settings, 'IMAGE_ENGINE_MAX_PENDING', None)
+                if not max_pending:
+                    max_pending = max(1, _configured_workers()) * 2
+                _slots = threading.BoundedSemaphore(int(max_pending))
+    return _slots
+
+
+def _get_executor() -> ProcessPoolExecutor | None:
+    """Return the shared pool, or None when IMAGE_ENGINE_WORKERS is 0 (inline mode)."""
+    global _executor
+
+    if _executor is not None:
+        return _executor
+
+    workers = _configured_workers()
+    if workers == 0:
+        return None
+
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a multi-threaded gunicorn worker is not safe.
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    """Drop a broken pool (e.g. a child was OOM-killed) so the next job starts a fresh one."""
+    global _executor
+
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _source_for(image_file):
+    """Return a picklable source for the worker: a filesystem path or raw bytes."""
+    if isinstance(image_file, (str, os.PathLike)):
+        return os.fspath(image_file)
+
+    temporary_file_path = getattr(image_file, 'temporary_file_path', None)
+    if callable(temporary_file_path):
+        return temporary_file_path()
+
+    try:
+        image_file.seek(0)
+    except Exception:
+        pass
+    return image_file.read()
+
+
+def _open_source(source):
+    return BytesIO(source) if isinstance(source, bytes) else source
+
+
+# The _run_* functions execute inside pool processes. They return plain
+# (name, bytes) tuples, which are cheap to pickle back to the parent.
+
+def _run_process_image(source, filename, options):
+    processed = ImageProcessor.process_image(_open_source(source), filename, **options)
+    return {key: (content.name, content.read()) for key, content in processed.items()}
+
+
+def _run_process_full_image(source, filename, options):
+    content = ImageProcessor.process_full_image(_open_source(source), filename, **options)
+    return content.name, content.read()
+
+
+def _to_content_files(result):
+    return {key: ContentFile(data, name=name) for key, (name, data) in result.items()}
+
+
+def _to_content_file(result):
+    name, data = result
+    return ContentFile(data, name=name)
+
+
+def _submit(fn, convert, image_file, filename, options) -> Future:
+    outer = Future()
+    executor = _get_executor()
+
+    if executor is None:
+        try:
+            outer.set_result(convert(fn(_source_for(image_file), filename, options)))
+        except Exception as exc:
+            outer.set_exception(exc)
+        return outer
+
+    slots = _get_slots()
+    # Blocks the submitting thread while the engine is saturated.
+    slots.acquire()
+    try:
+        source = _source_for(image_file)
+        try:
+            inner = executor.submit(fn, source, filename, options)
+        except BrokenProcessPool:
+            _discard_executor(executor)
+            executor = _get_executor()
+            inner = executor.submit(fn, source, filename, options)
+    except BaseException:
+        slots.release()
+        raise
+
+    def _done(future):
+        slots.release()
+        try:
+            outer.set_result(convert(future.result()))
+        except BrokenProcessPool as exc:
+            logger.warning("Image engine worker died; restarting pool: %s", exc)
+            _discard_executor(executor)
+            outer.set_exception(exc)
+        except BaseException as exc:
+            outer.set_exception(exc)
+
+    inner.add_done_callback(_done)
+    return outer
+
+
+def submit_image(image_file, filename, **options) -> Future:
+    """Queue ImageProcessor.process_image; the future resolves to its dict of ContentFiles."""
+    return _submit(_run_process_image, _to_content_files, image_file, filename, options)
+
+
+def submit_full_image(image_file, filename, **options) -> Future:
+    """Queue ImageProcessor.process_full_image; the future resolves to a ContentFile."""
+    return _submit(_run_process_full_image, _to_content_file, image_file, filename, options)
+
+
+def process_image(image_file, filename, **options):
+    """Blocking wrapper around submit_image."""
+    return submit_image(image_file, filename, **options).result()
+
+
+def process_full_image(image_file, filename, **options):
+    """Blocking wrapper around submit_full_image."""
+    return submit_full_image(image_file, filename, **options).result()
@@ -12,9 +12,51 @@ class ImageProcessor:
     QUALITY = 90
     WEBP_QUALITY = 85
 
+    # Resampling filter per derivative stage. Derivatives are produced as a
+    # cascade (original -> full -> medium -> thumbnail), so only the first
+    # stage ever touches the full-resolution bitmap.
+    FULL_RESAMPLE = Image.Resampling.LANCZOS
+    MEDIUM_RESAMPLE = Image.Resampling.LANCZOS
+    THUMBNAIL_RESAMPLE = Image.Resampling.LANCZOS
+    REDUCING_GAP = 2.0
+
+    # Let the JPEG decoder shrink on load (DCT scaling by 1/2, 1/4 or 1/8)
+    # when the largest requested output is much smaller than the source.
+    DRAFT_DECODE = True
+
     @staticmethod
-    def _open_and_normalize(image_file):
-        """Open an uploaded image and normalize orientation/color mode."""
+    def _apply_draft(img, box):
+        """Configure JPEG draft mode for an output that must fit inside box.
+
+        The decoder picks the smallest power-of-two reduction whose result is
+        still at least as large as the biggest derivative, so the resize that
+        follows never upscales. No-op for non-JPEG sources.
+        """
+        if img.format != 'JPEG' or not box:
+            return
+
+        width, height = img.size
+        try:
+            orientation = img.getexif().get(0x0112)
+        except Exception:
+            orientation = None
+        # Orientations 5-8 swap the axes once exif_transpose runs.
+        if orientation in (5, 6, 7, 8):
+            box = (box[1], box[0])
+
+        scale = min(box[0] / width, box[1] / height)
+        if scale >= 1:
+            return
+        requested = (max(1, round(width * scale)), max(1, round(height * scale)))
+        img.draft('RGB' if img.mode == 'RGB' else None, requested)
+
+    @staticmethod
+    def _open_and_normalize(image_file, draft_size=None):
+        """Open an uploaded image and normalize orientation/color mode.
+
+        When draft_size is given, JPEG sources are decoded directly at a
+        reduced scale that still covers that bounding box.
+        """
         try:
             try:
                 image_file.seek(0)
@@ -22,6 +64,8 @@ class ImageProcessor:
                 pass
 
             img = Image.open(image_file)
+            if draft_size:
+                ImageProcessor._apply_draft(img, draft_size)
 
             # Convert RGBA to RGB if needed
             if img.mode in ('RGBA', 'LA', 'P'):
@@ -45,69 +89,84 @@ class ImageProcessor:
             raise Exception(f"Image open/normalize failed: {str(e)}")
 
     @staticmethod
-    def process_full_image(image_file, filename, *, max_size=None, quality=None, suffix='full'):
+    def _fit_within(img, size, resample):
+        """Return img downscaled to fit inside size, keeping aspect ratio.
+
+        Never upscales; returns the same image object when it already fits.
+        """
+        width, height = img.size
+        scale = min(size[0] / width, size[1] / height)
+        if scale >= 1:
+            return img
+        target = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return img.resize(target, resample, reducing_gap=ImageProcessor.REDUCING_GAP)
+
+    @staticmethod
+    def _encode_webp(img, name, quality):
+        out_io = BytesIO()
+        img.save(out_io, format='WEBP', quality=quality, method=4)
+        return ContentFile(out_io.getvalue(), name=name)
+
+    @staticmethod
+    def process_full_image(image_file, filename, *, max_size=None, quality=None, suffix='full', resample=None, draft=None):
         """Process image and return a single WebP ContentFile (default: full size).
 
         This is intended for non-album uploads where we want only one optimized image.
         """
         try:
-            img = ImageProcessor._open_and_normalize(image_file)
-
             target_size = max_size or ImageProcessor.FULL_SIZE
+            use_draft = ImageProcessor.DRAFT_DECODE if draft is None else draft
+            img = ImageProcessor._open_and_normalize(image_file, draft_size=target_size if use_draft else None)
+
             target_quality = ImageProcessor.QUALITY if quality is None else quality
+            target_resample = ImageProcessor.FULL_RESAMPLE if resample is None else resample
 
             base_name = os.path.splitext(filename)[0]
-            out = img.copy()
-            out.thumbnail(target_size, Image.Resampling.LANCZOS)
-            out_io = BytesIO()
-            out.save(out_io, format='WEBP', quality=target_quality, method=4)
-            return ContentFile(out_io.getvalue(), name=f"{base_name}_{suffix}.webp")
+            out = ImageProcessor._fit_within(img, target_size, target_resample)
+            return ImageProcessor._encode_webp(out, f"{base_name}_{suffix}.webp", target_quality)
         except Exception as e:
             raise Exception(f"Image processing failed: {str(e)}")
     
     @staticmethod
-    def process_image(image_file, filename):
-        """Process image: compress, resize, convert to WebP"""
+    def process_image(image_file, filename, *, full_resample=None, medium_resample=None, thumbnail_resample=None, draft=None):
+        """Process image: compress, resize, convert to WebP.
+
+        Sizes are derived as a cascade: full from the original, medium from
+        full and thumbnail from medium. Each stage's resampling filter can be
+        overridden; the class-level *_RESAMPLE attributes are the defaults.
+        JPEG sources are decoded in draft mode unless draft=False.
+        """
         try:
-            img = ImageProcessor._open_and_normalize(image_file)
+            use_draft = ImageProcessor.DRAFT_DECODE if draft is None else draft
+            img = ImageProcessor._open_and_normalize(
+                image_file,
+                draft_size=ImageProcessor.FULL_SIZE if use_draft else None,
+            )
             
             base_name = os.path.splitext(filename)[0]
-            results = {}
-            
-            # Generate all sizes in parallel using threads
-            from concurrent.futures import ThreadPoolExecutor
-            
-            def create_thumbnail():
-                thumb = img.copy()
-                thumb.thumbnail(ImageProcessor.THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
-                thumb_io = BytesIO()
-                thumb.save(thumb_io, format='WEBP', quality=ImageProcessor.WEBP_QUALITY, method=4)
-                return ContentFile(thumb_io.getvalue(), name=f"{base_name}_thumb.webp")
-            
-            def create_medium():
-                medium = img.copy()
-                medium.thumbnail(ImageProcessor.MEDIUM_SIZE, Image.Resampling.LANCZOS)
-                medium_io = BytesIO()
-                medium.save(medium_io, format='WEBP', quality=ImageProcessor.WEBP_QUALITY, method=4)
-                return ContentFile(medium_io.getvalue(), name=f"{base_name}_medium.webp")
-            
-            def create_full():
-                full = img.copy()
-                full.thumbnail(ImageProcessor.FULL_SIZE, Image.Resampling.LANCZOS)
-                full_io = BytesIO()
-                full.save(full_io, format='WEBP', quality=ImageProcessor.QUALITY, method=4)
-                return ContentFile(full_io.getvalue(), name=f"{base_name}_full.webp")
-            
-            with ThreadPoolExecutor(max_workers=3) as executor:
-                thumb_future = executor.submit(create_thumbnail)
-                medium_future = executor.submit(create_medium)
-                full_future = executor.submit(create_full)
-                
-                results['thumbnail'] = thumb_future.result()
-                results['medium'] = medium_future.result()
-                results['full'] = full_future.result()
-            
-            return results
+
+            full = ImageProcessor._fit_within(
+                img,
+                ImageProcessor.FULL_SIZE,
+                ImageProcessor.FULL_RESAMPLE if full_resample is None else full_resample,
+            )
+            del img
+            medium = ImageProcessor._fit_within(
+                full,
+                ImageProcessor.MEDIUM_SIZE,
+                ImageProcessor.MEDIUM_RESAMPLE if medium_resample is None else medium_resample,
+            )
+            thumb = ImageProcessor._fit_within(
+                medium,
+                ImageProcessor.THUMBNAIL_SIZE,
+                ImageProcessor.THUMBNAIL_RESAMPLE if thumbnail_resample is None else thumbnail_resample,
+            )
+
+            return {
+                'thumbnail': ImageProcessor._encode_webp(thumb, f"{base_name}_thumb.webp", ImageProcessor.WEBP_QUALITY),
+                'medium': ImageProcessor._encode_webp(medium, f"{base_name}_medium.webp", ImageProcessor.WEBP_QUALITY),
+                'full': ImageProcessor._encode_webp(full, f"{base_name}_full.webp", ImageProcessor.QUALITY),
+            }
             
         except Exception as e:
             raise Exception(f"Image processing failed: {str(e)}")
@@ -0,0 +1,181 @@
+"""Write-coalescing like toggles for PhotoLikeView.
+
+With PHOTO_LIKE_BATCHING enabled a like/unlike tap only records the
+desired state for (photo, client IP) in memory and answers with an
+optimistic count. A background thread flushes the buffer every
+PHOTO_LIKE_FLUSH_INTERVAL seconds (sooner once PHOTO_LIKE_FLUSH_BATCH
+toggles are waiting). A flush is one transaction:
+- a bulk insert of new likes
+- a delete of withdrawn ones
+- one UPDATE that recomputes likes_count for the touched photos
+
+Toggled twice before a flush, a like costs nothing.
+
+The buffer is per process, so batching is only correct with a single
+worker process (threads are fine). With several gunicorn workers, a like
+and an unlike from the same IP can land on different workers before
+either flushes. Both then read "not liked" from the database and record a
+like, and the optimistic counts drift. Flushes recompute likes_count from
+PhotoLike rows, so stored totals stay internally consistent, but a toggle
+can be lost. Keep PHOTO_LIKE_BATCHING off for multi-worker deployments.
+
+The optimistic count is also approximate within one process. It is the
+stored likes_count plus the deltas of buffered and in-flight toggles.
+The view reads likes_count before calling toggle_like(), and a flush
+clears its in-flight delta only after its transaction commits. If a
+count read just after a commit meets a delta that hasn't been cleared
+yet, that batch is counted twice. A count read just before the commit,
+meeting an already-cleared delta, misses the batch. Either way the error
+lasts for a single response. The next response after the flush is exact.
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Photo, PhotoLike
+
+logger = logging.getLogger(__name__)
+
+
+# (photo_id, ip_address) -> liked?, for toggles not yet handed to a flush.
+_pending: dict = {}
+# Toggles currently being written; consulted so state stays consistent mid-flush.
+_inflight: dict = {}
+# photo_id -> net +/-1 adjustments not yet reflected in Photo.likes_count.
+_pending_delta: dict = defaultdict(int)
+_inflight_delta: dict = {}
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_wake_event = threading.Event()
+_worker_started = False
+
+
+def batching_enabled() -> bool:
+    return getattr(settings, 'PHOTO_LIKE_BATCHING', False)
+
+
+def toggle_like(photo_id: int, ip_address: str, stored_count: int) -> tuple[bool, int]:
+    """Buffer a like toggle; returns (liked, optimistic likes_count).
+
+    ``stored_count`` is the photo's current Photo.likes_count.
+    """
+    key = (photo_id, ip_address)
+    with _lock:
+        known = _pending.get(key, _inflight.get(key))
+    if known is None:
+        known = PhotoLike.objects.filter(photo_id=photo_id, ip_address=ip_address).exists()
+
+    with _lock:
+        # Re-read: another request for the same key may have raced us.
+        current = _pending.get(key, _inflight.get(key, known))
+        liked = not current
+        _pending[key] = liked
+        _pending_delta[photo_id] += 1 if liked else -1
+        likes_count = stored_count + _pending_delta[photo_id] + _inflight_delta.get(photo_id, 0)
+        backlog = len(_pending)
+
+    _ensure_worker()
+    if backlog >= getattr(settings, 'PHOTO_LIKE_FLUSH_BATCH', 500):
+        _wake_event.set()
+    return liked, max(0, likes_count)
+
+
+def flush_likes() -> int:
+    """Write buffered toggles to the database; returns the number applied."""
+    global _pending, _pending_delta, _inflight, _inflight_delta
+
+    with _flush_lock:
+        with _lock:
+            if not _pending:
+                return 0
+            _inflight, _pending = _pending, {}
+            _inflight_delta, _pending_delta = _pending_delta, defaultdict(int)
+        batch = _inflight
+
+        try:
+            _write_batch(batch)
+        except Exception:
+            logger.exception("Flushing %d buffered likes failed; will retry", len(batch))
+            with _lock:
+                # Newer toggles win; put back only keys not touched since.
+                for key, liked in batch.items():
+                    _pending.setdefault(key, liked)
+                for photo_id, delta in _inflight_delta.items():
+                    _pending_delta[photo_id] += delta
+            return 0
+        finally:
+            # Clear as soon as the batch is visible in likes_count; see the
+            # module docstring for the window before this runs.
+            with _lock:
+                _inflight, _inflight_delta = {}, {}
+
+        return len(batch)
+
+
+def _write_batch(batch: dict) -> None:
+    photo_ids = {photo_id for photo_id, _ in batch}
+    # Photos may have been deleted since the tap; their likes are dropped.
+    existing = set(Photo.objects.filter(id__in=photo_ids).values_list('id', flat=True))
+
+    likes = []
+    unlikes = defaultdict(list)
+    for (photo_id, ip_address), liked in batch.items():
+        if photo_id not in existing:
+            continue
+        if liked:
+            likes.append(PhotoLike(photo_id=photo_id, ip_address=ip_address))
+        else:
+            unlikes[photo_id].append(ip_address)
+
+    like_totals = (
+        PhotoLike.objects.filter(photo=OuterRef('pk'))
+        .order_by()
+        .values('photo')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    with transaction.atomic():
+        if likes:
+            PhotoLike.objects.bulk_create(likes, ignore_conflicts=True)
+        for photo_id, ips in unlikes.items():
+            PhotoLike.objects.filter(photo_id=photo_id, ip_address__in=ips).delete()
+        Photo.objects.filter(id__in=existing).update(
+            likes_count=Coalesce(Subquery(like_totals), 0)
+        )
+
+
+def _ensure_worker() -> None:
+    """Start a single background thread that flushes the buffer periodically."""
+    global _worker_started
+
+    if _worker_started:
+        return
+
+    with _lock:
+        if _worker_started:
+            return
+
+        interval = getattr(settings, 'PHOTO_LIKE_FLUSH_INTERVAL', 0.5)
+
+        def worker():
+            while True:
+                _wake_event.wait(timeout=interval)
+                _wake_event.clear()
+                try:
+                    flush_likes()
+                except Exception:
+                    logger.exception("Like flush worker iteration failed")
+                finally:
+                    close_old_connections()
+
+        thread = threading.Thread(target=worker, name='photo-like-flusher', daemon=True)
+        thread.start()
+        atexit.register(flush_likes)
+        _worker_started = True
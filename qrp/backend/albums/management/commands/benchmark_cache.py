@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from wedding_album.cache_backends import SQLiteCache
+
+PAYLOAD = {'content': 'x' * 2048, 'items': list(range(100))}
+
+
+def _make_backend(name, location):
+    if name == 'locmem':
+        return LocMemCache('benchmark', {'OPTIONS': {'MAX_ENTRIES': 100000}})
+    return SQLiteCache(location, {'OPTIONS': {'MAX_ENTRIES': 100000}})
+
+
+def _ops_per_second(fn, seconds):
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            fn(count)
+            count += 1
+    return count / seconds
+
+
+def _run_case(name, location, seconds):
+    """All operations for one backend, run in a fresh process."""
+    cache = _make_backend(name, location)
+    cache.set('hit', PAYLOAD)
+    cache.set('counter', 0)
+    return {
+        'get hit': _ops_per_second(lambda i: cache.get('hit'), seconds),
+        'get miss': _ops_per_second(lambda i: cache.get('missing'), seconds),
+        'set': _ops_per_second(lambda i: cache.set(f'key-{i % 1000}', PAYLOAD), seconds),
+        'incr': _ops_per_second(lambda i: cache.incr('counter'), seconds),
+    }
+
+
+def _worker_incr(name, location, seconds):
+    cache = _make_backend(name, location)
+    # A process-local cache starts empty in every worker.
+    cache.add('shared', 0, timeout=None)
+    return _ops_per_second(lambda i: cache.incr('shared'), seconds)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the shared SQLite cache backend against LocMemCache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=2, help='Duration of each measurement')
+        parser.add_argument('--workers', type=int, default=3, help='Processes for the shared-counter test')
+
+    def handle(self, *args, **options):
+        seconds = options['seconds']
+        workers = max(1, options['workers'])
+        ctx = multiprocessing.get_context('spawn')
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            location = os.path.join(tmp_dir, 'cache.sqlite3')
+
+            self.stdout.write(f"{'backend':<10}{'get hit':>12}{'get miss':>12}{'set':>12}{'incr':>12}   (ops/sec, one process)")
+            for name in ('locmem', 'sqlite'):
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+                    result = executor.submit(_run_case, name, location, seconds).result()
+                self.stdout.write(
+                    f"{name:<10}{result['get hit']:>12.0f}{result['get miss']:>12.0f}"
+                    f"{result['set']:>12.0f}{result['incr']:>12.0f}"
+                )
+
+            # Several worker processes incrementing one counter, as throttles do.
+            self.stdout.write(f'\nShared counter, {workers} processes:')
+            for name in ('locmem', 'sqlite'):
+                _make_backend(name, location).set('shared', 0, timeout=None)
+                with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as executor:
+                    rates = list(executor.map(_worker_incr, [name] * workers, [location] * workers, [seconds] * workers))
+                expected = int(sum(rates) * seconds)
+                seen = _make_backend(name, location).get('shared')
+                visible = 'yes' if seen and seen >= expected else 'no'
+                self.stdout.write(
+                    f"{name:<10}{sum(rates):>12.0f} incr/sec total   counter visible to all workers: {visible}"
+                )
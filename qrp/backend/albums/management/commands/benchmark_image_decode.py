@@ -0,0 +1,114 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from albums.image_processor import ImageProcessor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Typical camera sensor sizes (width, height) for 24, 45 and 61 megapixels.
+PRESETS = {
+    24: (6000, 4000),
+    45: (8256, 5504),
+    61: (9504, 6336),
+}
+
+
+def _max_rss_mb():
+    # VmHWM is tracked per address space, so unlike ru_maxrss it is not
+    # inherited from the (large) parent process across fork/exec.
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss is reported in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(path, draft, repeat):
+    """Run in a fresh process so peak RSS belongs to this case only."""
+    baseline = _max_rss_mb()
+
+    decode_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with open(path, 'rb') as f:
+            img = ImageProcessor._open_and_normalize(
+                f, draft_size=ImageProcessor.FULL_SIZE if draft else None
+            )
+            img.load()
+        decode_times.append(time.perf_counter() - start)
+        decoded_size = img.size
+        del img
+
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        ImageProcessor.process_image(f, 'benchmark', draft=draft)
+    pipeline_time = time.perf_counter() - start
+
+    peak = _max_rss_mb()
+    return {
+        'decode_ms': min(decode_times) * 1000,
+        'pipeline_ms': pipeline_time * 1000,
+        'decoded_size': decoded_size,
+        'bitmap_mb': decoded_size[0] * decoded_size[1] * 3 / (1024 * 1024),
+        'peak_rss_mb': (peak - baseline) if peak is not None else None,
+    }
+
+
+def _make_test_jpeg(path, size):
+    # Noise over a gradient compresses like real photos rather than flat colour.
+    noise = Image.effect_noise(size, 48)
+    gradient = Image.linear_gradient('L').resize(size)
+    Image.merge('RGB', (noise, gradient, Image.blend(noise, gradient, 0.5))).save(path, 'JPEG', quality=92)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JPEG decode time and memory with and without draft (shrink-on-load) mode'
+
+    def add_arguments(self, parser):
+        parser.add_argument('images', nargs='*', help='JPEG files to benchmark (default: synthetic 24/45/61 MP images)')
+        parser.add_argument('--megapixels', type=int, nargs='+', choices=sorted(PRESETS), default=sorted(PRESETS))
+        parser.add_argument('--repeat', type=int, default=3, help='Decode repetitions per case (best time is reported)')
+
+    def handle(self, *args, **options):
+        repeat = max(1, options['repeat'])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cases = [(os.path.basename(p), p) for p in options['images']]
+            if not cases:
+                for mp in options['megapixels']:
+                    path = os.path.join(tmp_dir, f'{mp}mp.jpg')
+                    self.stdout.write(f'Generating {mp} MP test image...')
+                    _make_test_jpeg(path, PRESETS[mp])
+                    cases.append((f'{mp} MP', path))
+
+            self.stdout.write(
+                f"{'image':<14}{'mode':<8}{'decoded':>13}{'bitmap MB':>11}{'decode ms':>11}"
+                f"{'pipeline ms':>13}{'peak RSS MB':>13}"
+            )
+            ctx = multiprocessing.get_context('spawn')
+            for label, path in cases:
+                for draft in (False, True):
+                    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+                        result = executor.submit(_measure, path, draft, repeat).result()
+                    rss = f"{result['peak_rss_mb']:.0f}" if result['peak_rss_mb'] is not None else 'n/a'
+                    decoded = '{}x{}'.format(*result['decoded_size'])
+                    self.stdout.write(
+                        f"{label:<14}{'draft' if draft else 'full':<8}{decoded:>13}{result['bitmap_mb']:>11.0f}"
+                        f"{result['decode_ms']:>11.0f}{result['pipeline_ms']:>13.0f}{rss:>13}"
+                    )
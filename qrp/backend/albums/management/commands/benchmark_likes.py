@@ -0,0 +1,103 @@
+import random
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Count, F
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from albums import likes
+from albums.models import Album, Photo
+from albums.views import PhotoLikeView
+
+
+class Command(BaseCommand):
+    help = 'Benchmark sustained PhotoLikeView throughput with and without write batching'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=10, help='Duration of each run')
+        parser.add_argument('--threads', type=int, default=1, help='Concurrent request threads (one worker process)')
+        parser.add_argument('--photos', type=int, default=50, help='Photos in the throwaway album')
+        parser.add_argument('--guests', type=int, default=2000, help='Distinct client IPs sending likes')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        tag = uuid.uuid4().hex[:8]
+        owner = User.objects.create(username=f'benchmark-likes-{tag}')
+        album = Album.objects.create(owner=owner, names=f'Like benchmark {tag}', date='2000-01-01')
+        Photo.objects.bulk_create(
+            Photo(album=album, order=i, url=f'/media/benchmark/{tag}/{i}.webp') for i in range(options['photos'])
+        )
+        photo_ids = list(album.photos.values_list('id', flat=True))
+
+        try:
+            self.stdout.write(f"{'mode':<10}{'requests':>10}{'likes/sec':>12}{'p50 ms':>9}{'p99 ms':>9}{'flush ms':>10}")
+            for batching in (False, True):
+                with override_settings(PHOTO_LIKE_BATCHING=batching):
+                    self._run(album.slug, photo_ids, batching, options)
+                self._check_counts(album)
+        finally:
+            album.delete()
+            owner.delete()
+
+    def _run(self, slug, photo_ids, batching, options):
+        factory = APIRequestFactory()
+        view = PhotoLikeView.as_view()
+        deadline = time.perf_counter() + options['seconds']
+        latencies = []
+        lock = threading.Lock()
+
+        def client():
+            rng = random.Random()
+            local = []
+            try:
+                while time.perf_counter() < deadline:
+                    photo_id = rng.choice(photo_ids)
+                    guest = rng.randrange(options['guests'])
+                    request = factory.post(
+                        f'/api/albums/{slug}/photos/{photo_id}/like/',
+                        REMOTE_ADDR=f'10.{guest // 65536 % 256}.{guest // 256 % 256}.{guest % 256}',
+                    )
+                    start = time.perf_counter()
+                    view(request, slug=slug, photo_id=photo_id)
+                    local.append(time.perf_counter() - start)
+            finally:
+                close_old_connections()
+            with lock:
+                latencies.extend(local)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client) for _ in range(max(1, options['threads']))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Throughput only counts once the buffered likes are in the database.
+        flush_start = time.perf_counter()
+        if batching:
+            likes.flush_likes()
+        flush_ms = (time.perf_counter() - flush_start) * 1000
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        count = len(latencies)
+        p50 = latencies[count // 2] * 1000 if count else 0
+        p99 = latencies[min(count - 1, int(count * 0.99))] * 1000 if count else 0
+        self.stdout.write(
+            f"{'batched' if batching else 'direct':<10}{count:>10}{count / elapsed:>12.0f}"
+            f"{p50:>9.2f}{p99:>9.2f}{flush_ms:>10.1f}"
+        )
+
+    def _check_counts(self, album):
+        mismatched = (
+            album.photos.annotate(actual=Count('likes'))
+            .exclude(likes_count=F('actual'))
+            .count()
+        )
+        if mismatched:
+            self.stdout.write(self.style.ERROR(f'{mismatched} photos have likes_count out of sync'))
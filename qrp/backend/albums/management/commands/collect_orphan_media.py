@@ -0,0 +1,147 @@
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from albums import media_registry, media_storage
+from albums.archive import ARCHIVE_DIR
+from albums.media_deletions import remove_empty_dirs
+from albums.models import MediaAsset, Photo
+
+CHUNK_SIZE = 2000
+
+# Managed elsewhere: cached album archives and raw files of queued upload jobs.
+DEFAULT_EXCLUDES = (ARCHIVE_DIR, 'uploads/pending')
+
+
+def _scan_directory(path):
+    """(files, subdirectories) of one directory; files as (path, size, mtime)."""
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        files.append((entry.path, stat.st_size, stat.st_mtime))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, subdirs
+
+
+class Command(BaseCommand):
+    help = 'Find (and delete) files under MEDIA_ROOT that no model references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report orphaned files without deleting them')
+        parser.add_argument(
+            '--grace-hours', type=float, default=48,
+            help='Ignore files modified more recently than this (uploads not yet saved to an album)',
+        )
+        parser.add_argument('--workers', type=int, default=8, help='Threads scanning directories in parallel')
+        parser.add_argument(
+            '--exclude', action='append', default=[],
+            help=f"MEDIA_ROOT-relative directory to skip (repeatable; always skips {', '.join(DEFAULT_EXCLUDES)})",
+        )
+
+    def handle(self, *args, **options):
+        if not media_storage.is_local():
+            raise CommandError('collect_orphan_media only scans local MEDIA_ROOT storage')
+
+        media_root = os.path.abspath(settings.MEDIA_ROOT)
+        excludes = {
+            os.path.normpath(os.path.join(media_root, path))
+            for path in (*DEFAULT_EXCLUDES, *options['exclude'])
+        }
+        cutoff = time.time() - options['grace_hours'] * 3600
+
+        referenced = self._referenced_paths()
+        self.stdout.write(f'{len(referenced)} referenced file(s) in the database')
+
+        # directory -> [files, orphans, orphan bytes]
+        summary = defaultdict(lambda: [0, 0, 0])
+        orphans = []
+        for path, size, mtime in self._walk(media_root, excludes, max(1, options['workers'])):
+            relative_path = os.path.relpath(path, media_root).replace(os.sep, '/')
+            entry = summary[relative_path.split('/', 1)[0] if '/' in relative_path else '.']
+            entry[0] += 1
+            if relative_path in referenced or mtime > cutoff:
+                continue
+            entry[1] += 1
+            entry[2] += size
+            orphans.append((path, relative_path, size))
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'  {relative_path} ({size} bytes)')
+
+        self._print_summary(summary)
+
+        if options['dry_run']:
+            self.stdout.write('Dry run: nothing deleted')
+            return
+
+        deleted, freed = self._delete(orphans, media_root)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} file(s), freed {freed / 1048576:.1f} MB'))
+
+    def _referenced_paths(self):
+        referenced = set()
+        for model, fields in media_registry.FILE_FIELDS.items():
+            for row in model.objects.values_list(*fields).iterator(chunk_size=CHUNK_SIZE):
+                referenced.update(
+                    path for path in (media_registry.path_from_file_name(name or '') for name in row) if path
+                )
+        for row in Photo.objects.values_list(*media_registry.PHOTO_URL_FIELDS).iterator(chunk_size=CHUNK_SIZE):
+            referenced.update(media_registry.photo_paths(row))
+        return referenced
+
+    def _walk(self, media_root, excludes, workers):
+        """Yield (path, size, mtime) for every file, scanning directories in parallel."""
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {executor.submit(_scan_directory, media_root)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs = future.result()
+                    yield from files
+                    for subdir in subdirs:
+                        if os.path.normpath(subdir) not in excludes:
+                            pending.add(executor.submit(_scan_directory, subdir))
+
+    def _delete(self, orphans, media_root):
+        deleted = 0
+        freed = 0
+        removed_paths = []
+        for path, relative_path, size in orphans:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            except OSError as exc:
+                self.stderr.write(f'Unable to delete {relative_path}: {exc}')
+                continue
+            remove_empty_dirs(os.path.dirname(path), media_root)
+            deleted += 1
+            freed += size
+            removed_paths.append(relative_path)
+
+        # Registry rows of files that are gone and unreferenced are dead weight.
+        for start in range(0, len(removed_paths), 500):
+            MediaAsset.objects.filter(path__in=removed_paths[start:start + 500], ref_count=0).delete()
+        return deleted, freed
+
+    def _print_summary(self, summary):
+        self.stdout.write(f"{'directory':<20}{'files':>10}{'orphans':>10}{'orphan MB':>12}")
+        totals = [0, 0, 0]
+        for directory, entry in sorted(summary.items(), key=lambda item: -item[1][2]):
+            self.stdout.write(f'{directory:<20}{entry[0]:>10}{entry[1]:>10}{entry[2] / 1048576:>12.1f}')
+            totals = [total + value for total, value in zip(totals, entry)]
+        self.stdout.write(f"{'total':<20}{totals[0]:>10}{totals[1]:>10}{totals[2] / 1048576:>12.1f}")
@@ -1,68 +1,82 @@
 import os
+from collections import deque
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from albums.models import Photo
-from albums.image_processor import ImageProcessor
+from albums import image_engine
 from urllib.parse import urlparse
 
 class Command(BaseCommand):
     help = 'Optimize existing images by generating thumbnails and WebP versions'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full-decode',
+            action='store_true',
+            help='Decode JPEGs at native resolution instead of using draft (shrink-on-load) mode',
+        )
+
     def handle(self, *args, **options):
+        draft = not options['full_decode']
         photos = Photo.objects.filter(thumbnail_url='')
         total = photos.count()
         
         self.stdout.write(f'Found {total} photos to optimize...')
         
-        processed = 0
-        errors = 0
+        self.processed = 0
+        self.errors = 0
+        self.total = total
+
+        # Jobs are submitted to the shared image engine; submit_image blocks
+        # once the engine is saturated, so at most a bounded number of photos
+        # are in flight at a time.
+        pending = deque()
         
-        for photo in photos:
-            try:
-                parsed = urlparse(photo.url)
-                relative_path = parsed.path.lstrip('/')
-                if relative_path.startswith('media/'):
-                    relative_path = relative_path[6:]
-                
-                file_path = os.path.join(settings.MEDIA_ROOT, relative_path)
-                
-                if not os.path.exists(file_path):
-                    self.stdout.write(self.style.WARNING(f'File not found: {file_path}'))
-                    errors += 1
-                    continue
-                
-                directory = os.path.dirname(file_path)
-                filename = os.path.basename(file_path)
-                base_name = os.path.splitext(filename)[0]
-                
-                with open(file_path, 'rb') as f:
-                    processed_images = ImageProcessor.process_image(f, base_name)
-                
-                thumb_path = os.path.join(directory, processed_images['thumbnail'].name)
-                medium_path = os.path.join(directory, processed_images['medium'].name)
-                full_path = os.path.join(directory, processed_images['full'].name)
-                
-                with open(thumb_path, 'wb') as dest:
-                    dest.write(processed_images['thumbnail'].read())
-                with open(medium_path, 'wb') as dest:
-                    dest.write(processed_images['medium'].read())
-                with open(full_path, 'wb') as dest:
-                    dest.write(processed_images['full'].read())
-                
-                base_url = photo.url.rsplit('/', 1)[0] + '/'
-                photo.thumbnail_url = base_url + processed_images['thumbnail'].name
-                photo.medium_url = base_url + processed_images['medium'].name
-                photo.url = base_url + processed_images['full'].name
-                photo.save()
-                
-                processed += 1
-                if processed % 10 == 0:
-                    self.stdout.write(f'Processed {processed}/{total}...')
-                
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'Error processing photo {photo.id}: {str(e)}'))
-                errors += 1
+        for photo in photos.iterator():
+            parsed = urlparse(photo.url)
+            relative_path = parsed.path.lstrip('/')
+            if relative_path.startswith('media/'):
+                relative_path = relative_path[6:]
+            
+            file_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+            
+            if not os.path.exists(file_path):
+                self.stdout.write(self.style.WARNING(f'File not found: {file_path}'))
+                self.errors += 1
+                continue
+            
+            base_name = os.path.splitext(os.path.basename(file_path))[0]
+            future = image_engine.submit_image(file_path, base_name, draft=draft)
+            pending.append((photo, os.path.dirname(file_path), future))
+
+            while pending and pending[0][2].done():
+                self._finish(*pending.popleft())
+
+        while pending:
+            self._finish(*pending.popleft())
         
         self.stdout.write(self.style.SUCCESS(
-            f'Optimization complete! Processed: {processed}, Errors: {errors}'
+            f'Optimization complete! Processed: {self.processed}, Errors: {self.errors}'
         ))
+
+    def _finish(self, photo, directory, future):
+        try:
+            processed_images = future.result()
+
+            for key in ('thumbnail', 'medium', 'full'):
+                with open(os.path.join(directory, processed_images[key].name), 'wb') as dest:
+                    dest.write(processed_images[key].read())
+            
+            base_url = photo.url.rsplit('/', 1)[0] + '/'
+            photo.thumbnail_url = base_url + processed_images['thumbnail'].name
+            photo.medium_url = base_url + processed_images['medium'].name
+            photo.url = base_url + processed_images['full'].name
+            photo.save()
+            
+            self.processed += 1
+            if self.processed % 10 == 0:
+                self.stdout.write(f'Processed {self.processed}/{self.total}...')
+            
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error processing photo {photo.id}: {str(e)}'))
+            self.errors += 1
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from albums.media_deletions import run_pending_deletions
+
+
+class Command(BaseCommand):
+    help = 'Delete queued media files that are no longer referenced'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument('--interval', type=float, default=10.0, help='Seconds to wait between polls')
+
+    def handle(self, *args, **options):
+        while True:
+            handled = run_pending_deletions()
+            if handled:
+                self.stdout.write(f'Handled {handled} queued media deletion(s)')
+            if options['once']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from albums.upload_jobs import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Process queued asynchronous upload jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to wait between polls')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = run_pending_jobs()
+            if processed:
+                self.stdout.write(f'Processed {processed} upload job(s)')
+            if options['once']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
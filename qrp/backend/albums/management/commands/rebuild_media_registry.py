@@ -0,0 +1,93 @@
+from collections import Counter, defaultdict
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from albums import media_registry
+from albums.models import MediaAsset, Photo
+
+CHUNK_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = 'Recount media file references from scratch and report storage usage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--if-empty', action='store_true', help='Only rebuild when the registry has no rows yet')
+        parser.add_argument('--sizes', action='store_true', help='Record file sizes for rows that have none')
+        parser.add_argument('--report', action='store_true', help='Print storage usage per top-level directory')
+
+    def handle(self, *args, **options):
+        if options['if_empty'] and MediaAsset.objects.exists():
+            self.stdout.write('Media registry already populated; skipping rebuild')
+        else:
+            self._rebuild()
+
+        if options['sizes']:
+            self._record_sizes()
+        if options['report']:
+            self._report()
+
+    def _rebuild(self):
+        counts = Counter()
+        for model, fields in media_registry.FILE_FIELDS.items():
+            for row in model.objects.values_list(*fields).iterator(chunk_size=CHUNK_SIZE):
+                counts.update(
+                    path for path in (media_registry.path_from_file_name(name or '') for name in row) if path
+                )
+        for row in Photo.objects.values_list(*media_registry.PHOTO_URL_FIELDS).iterator(chunk_size=CHUNK_SIZE):
+            counts.update(media_registry.photo_paths(row))
+
+        # Run while nothing else writes media references (e.g. before the
+        # app server starts); concurrent saves could be counted twice.
+        with transaction.atomic():
+            MediaAsset.objects.exclude(ref_count=0).update(ref_count=0)
+            media_registry.acquire(counts.elements())
+
+        unreferenced = MediaAsset.objects.filter(ref_count=0).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Registered {len(counts)} referenced file(s) ({sum(counts.values())} references); '
+            f'{unreferenced} registered file(s) are no longer referenced'
+        ))
+
+    def _record_sizes(self):
+        pending = []
+        updated = 0
+        for asset in MediaAsset.objects.filter(size__isnull=True).only('id', 'path').iterator(chunk_size=CHUNK_SIZE):
+            try:
+                asset.size = default_storage.size(asset.path)
+            except (OSError, NotImplementedError):
+                continue
+            pending.append(asset)
+            if len(pending) >= CHUNK_SIZE:
+                updated += MediaAsset.objects.bulk_update(pending, ['size'])
+                pending = []
+        if pending:
+            updated += MediaAsset.objects.bulk_update(pending, ['size'])
+        self.stdout.write(f'Recorded sizes for {updated} file(s)')
+
+    def _report(self):
+        usage = defaultdict(lambda: [0, 0, 0, 0])
+        rows = MediaAsset.objects.values_list('path', 'ref_count', 'size').iterator(chunk_size=CHUNK_SIZE)
+        for path, ref_count, size in rows:
+            entry = usage[path.split('/', 1)[0] if '/' in path else '.']
+            entry[0] += 1
+            if ref_count == 0:
+                entry[1] += 1
+            entry[2] += size or 0
+            if ref_count == 0:
+                entry[3] += size or 0
+
+        self.stdout.write(f"{'directory':<20}{'files':>10}{'unused':>10}{'MB':>12}{'unused MB':>12}")
+        totals = [0, 0, 0, 0]
+        for directory, entry in sorted(usage.items(), key=lambda item: -item[1][2]):
+            self.stdout.write(
+                f'{directory:<20}{entry[0]:>10}{entry[1]:>10}'
+                f'{entry[2] / 1048576:>12.1f}{entry[3] / 1048576:>12.1f}'
+            )
+            totals = [total + value for total, value in zip(totals, entry)]
+        self.stdout.write(
+            f"{'total':<20}{totals[0]:>10}{totals[1]:>10}"
+            f'{totals[2] / 1048576:>12.1f}{totals[3] / 1048576:>12.1f}'
+        )
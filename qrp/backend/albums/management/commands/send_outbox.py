@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from albums.outbox import send_pending
+
+
+class Command(BaseCommand):
+    help = 'Send queued email from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit')
+        parser.add_argument('--interval', type=float, default=10.0, help='Seconds to wait between polls')
+
+    def handle(self, *args, **options):
+        while True:
+            handled = send_pending()
+            if handled:
+                self.stdout.write(f'Handled {handled} queued email(s)')
+            if options['once']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
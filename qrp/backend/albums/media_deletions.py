@@ -0,0 +1,205 @@
+"""DB-backed queue of stored files waiting to be deleted.
+
+Signal handlers and bulk edits release a file's references in the media
+registry and enqueue its storage path in the same transaction. A pending
+delete therefore commits or rolls back with the change that caused it and
+survives restarts and deploys. Workers claim due rows in batches. They skip
+files that something references again, and delete the rest through the
+default storage. A failed delete (for example a video locked by another
+process on Windows) is retried with exponential backoff. After
+MEDIA_DELETION_MAX_ATTEMPTS failures a row stops being retried and stays in
+the table with its last error.
+
+The worker is either a background thread in the web process (started on
+demand) or the process_media_deletions management command. Claiming pushes
+next_run_at past a lease, so any number of workers can run side by side; a
+worker that dies mid-batch leaves its rows to be picked up again once the
+lease expires. Deleting a file twice is harmless.
+"""
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import media_registry
+from .models import PendingMediaDeletion
+
+logger = logging.getLogger(__name__)
+
+_BATCH_SIZE = 500
+# Claimed rows become due again after this long if their worker died.
+LEASE_SECONDS = 5 * 60
+
+_wake_event = threading.Event()
+_worker_started = False
+_worker_lock = threading.Lock()
+
+
+def _max_attempts() -> int:
+    return getattr(settings, 'MEDIA_DELETION_MAX_ATTEMPTS', 8)
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(3600, 5 * 2 ** (attempts - 1)))
+
+
+def enqueue(paths) -> int:
+    """Queue storage paths for deletion; returns how many distinct paths.
+
+    Call inside the transaction that released the files. The worker is
+    woken once it commits.
+    """
+    max_length = PendingMediaDeletion._meta.get_field('path').max_length
+    paths = sorted({path for path in paths if path and len(path) <= max_length})
+    if not paths:
+        return 0
+
+    now = timezone.now()
+    for start in range(0, len(paths), _BATCH_SIZE):
+        batch = paths[start:start + _BATCH_SIZE]
+        PendingMediaDeletion.objects.bulk_create(
+            [PendingMediaDeletion(path=path, next_run_at=now) for path in batch],
+            ignore_conflicts=True,
+        )
+        # A path queued again after giving up gets a fresh set of attempts.
+        PendingMediaDeletion.objects.filter(path__in=batch, attempts__gte=_max_attempts()).update(
+            attempts=0, next_run_at=now, last_error=''
+        )
+    transaction.on_commit(wake_worker)
+    return len(paths)
+
+
+def wake_worker() -> None:
+    """Signal that deletions are due, starting the in-process worker if enabled."""
+    if getattr(settings, 'MEDIA_DELETIONS_IN_PROCESS_WORKER', True):
+        _ensure_worker()
+    _wake_event.set()
+
+
+def _ensure_worker() -> None:
+    """Start a single background thread that drains the queue in this process."""
+    global _worker_started
+
+    if _worker_started:
+        return
+
+    with _worker_lock:
+        if _worker_started:
+            return
+
+        poll_interval = getattr(settings, 'MEDIA_DELETIONS_POLL_INTERVAL', 30)
+
+        def worker():
+            while True:
+                _wake_event.clear()
+                try:
+                    run_pending_deletions()
+                except Exception:
+                    logger.exception("Media deletion worker iteration failed")
+                finally:
+                    close_old_connections()
+                _wake_event.wait(timeout=poll_interval)
+
+        thread = threading.Thread(target=worker, name='media-delete-worker', daemon=True)
+        thread.start()
+        _worker_started = True
+
+
+def claim_due(batch_size: int) -> list[PendingMediaDeletion]:
+    """Lease up to ``batch_size`` due rows to this worker."""
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            PendingMediaDeletion.objects.select_for_update(skip_locked=True)
+            .filter(next_run_at__lte=now, attempts__lt=_max_attempts())
+            .order_by('next_run_at')[:batch_size]
+        )
+        if rows:
+            PendingMediaDeletion.objects.filter(pk__in=[row.pk for row in rows]).update(
+                next_run_at=now + timedelta(seconds=LEASE_SECONDS)
+            )
+    return rows
+
+
+def remove_empty_dirs(start_dir: str, media_root: str) -> None:
+    """Remove empty directories up to MEDIA_ROOT."""
+    current_dir = os.path.abspath(start_dir)
+    media_root = os.path.abspath(media_root)
+
+    while current_dir.startswith(media_root) and current_dir != media_root:
+        try:
+            os.rmdir(current_dir)
+        except OSError:
+            break
+        current_dir = os.path.dirname(current_dir)
+
+
+def _delete_stored_file(path: str) -> None:
+    # Storage.delete() is the most portable option (works for local + S3, etc.)
+    default_storage.delete(path)
+
+    # Best-effort: remove empty directories for local FileSystemStorage
+    try:
+        absolute_path = default_storage.path(path)
+    except NotImplementedError:
+        return
+    remove_empty_dirs(os.path.dirname(absolute_path), settings.MEDIA_ROOT)
+
+
+def process_batch(batch_size: int | None = None) -> int:
+    """Claim one batch of due deletions and run it; returns rows handled."""
+    batch_size = batch_size or getattr(settings, 'MEDIA_DELETION_BATCH_SIZE', 200)
+    rows = claim_due(batch_size)
+    if not rows:
+        return 0
+
+    # Safety: a file may have been referenced again since it was queued.
+    referenced = media_registry.referenced_paths(row.path for row in rows)
+
+    finished = []
+    failed = []
+    now = timezone.now()
+    for row in rows:
+        if row.path not in referenced:
+            try:
+                _delete_stored_file(row.path)
+            except SuspiciousFileOperation as exc:
+                logger.warning("Refusing to delete %s: %s", row.path, exc)
+            except Exception as exc:
+                row.attempts += 1
+                row.last_error = str(exc)
+                row.next_run_at = now + _retry_delay(row.attempts)
+                failed.append(row)
+                logger.warning(
+                    "Unable to delete stored file %s (attempt %s/%s): %s",
+                    row.path,
+                    row.attempts,
+                    _max_attempts(),
+                    exc,
+                )
+                continue
+        finished.append(row.pk)
+
+    PendingMediaDeletion.objects.filter(pk__in=finished).delete()
+    if failed:
+        PendingMediaDeletion.objects.bulk_update(failed, ['attempts', 'last_error', 'next_run_at'])
+    return len(rows)
+
+
+def run_pending_deletions(max_batches=None) -> int:
+    """Process due deletions until none are left (or max_batches ran)."""
+    handled = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        count = process_batch()
+        if not count:
+            break
+        handled += count
+        batches += 1
+    return handled
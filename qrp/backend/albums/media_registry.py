@@ -0,0 +1,195 @@
+"""Reference counts for stored media files.
+
+MediaAsset keeps one row per MEDIA_ROOT-relative path, holding the number of
+model fields that currently point at that file. The fields are the FileFields
+in FILE_FIELDS and Photo's three URL fields. The signal handlers in
+albums.signals keep the counts current for single-object saves and deletes.
+Bulk writes (bulk_create, bulk_update, queryset deletes) send no per-object
+signals, so their callers must call acquire()/release() themselves.
+
+"Is this file still used?" is then a single indexed lookup. A path without a
+row has never been seen by the registry, for example a file stored before the
+registry existed. In that case callers fall back to scanning the referencing
+tables. ``manage.py rebuild_media_registry`` recounts everything from scratch.
+"""
+from collections import Counter
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import (
+    MediaAsset,
+    MediaItem,
+    Photo,
+    PortfolioImage,
+    ServiceGalleryImage,
+    Testimonial,
+    Video,
+)
+
+# FileFields that hold stored media, per model.
+FILE_FIELDS = {
+    Testimonial: ('avatar',),
+    ServiceGalleryImage: ('image',),
+    PortfolioImage: ('image',),
+    Video: ('video_file', 'thumbnail'),
+    MediaItem: ('file',),
+}
+
+PHOTO_URL_FIELDS = ('url', 'thumbnail_url', 'medium_url')
+
+_BATCH_SIZE = 500
+_PATH_MAX_LENGTH = MediaAsset._meta.get_field('path').max_length
+
+
+def path_from_url(url: str) -> str | None:
+    """Return storage-relative path for MEDIA_URL-backed URLs.
+
+    MEDIA_URL may be a path ('/media/') or absolute (a CDN or bucket URL).
+    An absolute MEDIA_URL only matches absolute URLs on the same host, but
+    relative URLs are still matched by path.
+    """
+    if not url:
+        return None
+
+    parsed = urlparse(url)
+    media_url = urlparse(settings.MEDIA_URL or '')
+    if media_url.netloc and parsed.netloc and parsed.netloc != media_url.netloc:
+        return None
+
+    request_path = parsed.path.lstrip('/')
+    media_prefix = media_url.path.lstrip('/')
+    if media_prefix:
+        if not request_path.startswith(media_prefix):
+            return None
+        request_path = request_path[len(media_prefix):]
+    elif not (media_url.netloc and parsed.netloc):
+        return None
+
+    return unquote(request_path).lstrip('/') or None
+
+
+def path_from_file_name(name: str) -> str | None:
+    """Storage path for a FileField name (which may hold an absolute URL)."""
+    if not name:
+        return None
+    if name.startswith('http://') or name.startswith('https://'):
+        return path_from_url(name)
+    return name
+
+
+def instance_paths(instance) -> list[str]:
+    """Storage paths ``instance`` references, one entry per field."""
+    model = instance._meta.concrete_model
+    if model is Photo:
+        paths = (path_from_url(getattr(instance, field, '')) for field in PHOTO_URL_FIELDS)
+    else:
+        paths = (
+            path_from_file_name(getattr(getattr(instance, field, None), 'name', '') or '')
+            for field in FILE_FIELDS.get(model, ())
+        )
+    return [path for path in paths if path]
+
+
+def photo_paths(urls) -> list[str]:
+    """Storage paths for photo URLs, one entry per URL."""
+    paths = (path_from_url(url) for url in urls)
+    return [path for path in paths if path]
+
+
+def _counts(paths) -> Counter:
+    # Paths too long for the column can't be tracked; they stay "unknown".
+    return Counter(path for path in paths if path and len(path) <= _PATH_MAX_LENGTH)
+
+
+def _apply(counts: Counter, sign: int) -> None:
+    """Add ``sign * n`` to each path's count, one UPDATE per distinct n."""
+    by_amount = {}
+    for path, amount in counts.items():
+        by_amount.setdefault(amount, []).append(path)
+
+    now = timezone.now()
+    for amount, paths in by_amount.items():
+        paths.sort()
+        if sign > 0:
+            new_count = F('ref_count') + amount
+        else:
+            new_count = Greatest(F('ref_count') - amount, Value(0))
+        for start in range(0, len(paths), _BATCH_SIZE):
+            MediaAsset.objects.filter(path__in=paths[start:start + _BATCH_SIZE]).update(
+                ref_count=new_count, updated_at=now
+            )
+
+
+def acquire(paths) -> None:
+    """Record one new reference per entry in ``paths``."""
+    counts = _counts(paths)
+    if not counts:
+        return
+    with transaction.atomic():
+        MediaAsset.objects.bulk_create(
+            [MediaAsset(path=path) for path in sorted(counts)],
+            ignore_conflicts=True,
+            batch_size=_BATCH_SIZE,
+        )
+        _apply(counts, 1)
+
+
+def release(paths) -> None:
+    """Drop one reference per entry in ``paths``. Counts never go below zero."""
+    counts = _counts(paths)
+    if counts:
+        _apply(counts, -1)
+
+
+def reference_counts(paths) -> dict[str, int]:
+    """ref_count for each of ``paths`` the registry knows about."""
+    paths = sorted({path for path in paths if path})
+    counts = {}
+    for start in range(0, len(paths), _BATCH_SIZE):
+        counts.update(
+            MediaAsset.objects.filter(path__in=paths[start:start + _BATCH_SIZE]).values_list('path', 'ref_count')
+        )
+    return counts
+
+
+def is_referenced(path: str) -> bool | None:
+    """True/False from the registry, or None if it has no row for ``path``."""
+    count = reference_counts([path]).get(path)
+    if count is None:
+        return None
+    return count > 0
+
+
+def _scan_for_references(path: str) -> bool:
+    """Conservative check for paths the registry doesn't track."""
+    for model, fields in FILE_FIELDS.items():
+        for field in fields:
+            if model.objects.filter(**{field: path}).exists():
+                return True
+
+    # Extra safety: some systems store absolute URLs for Photo; use endswith checks.
+    for field in PHOTO_URL_FIELDS:
+        if Photo.objects.filter(**{f"{field}__endswith": path}).exists():
+            return True
+
+    return False
+
+
+def referenced_paths(paths) -> set[str]:
+    """The paths among ``paths`` that something still references.
+
+    Registry rows answer in batches; paths without a row fall back to
+    scanning every file field and the Photo URL fields.
+    """
+    paths = {path for path in paths if path}
+    counts = reference_counts(paths)
+    referenced = {path for path, count in counts.items() if count > 0}
+    for path in paths - counts.keys():
+        if _scan_for_references(path):
+            referenced.add(path)
+    return referenced
@@ -0,0 +1,46 @@
+"""Concurrent writes through Django's default storage.
+
+Album derivatives are saved with ``default_storage``. They land in
+MEDIA_ROOT or in an S3-compatible bucket, depending on STORAGES (see
+MEDIA_STORAGE in settings). Remote saves are network-bound, so save_async()
+runs them on a thread pool shared by the process. The pool size is
+MEDIA_STORAGE_WRITE_WORKERS.
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, getattr(settings, 'MEDIA_STORAGE_WRITE_WORKERS', 8)),
+                    thread_name_prefix='media-storage-writer',
+                )
+    return _executor
+
+
+def save_async(name: str, content) -> Future:
+    """Start saving ``content`` as ``name``; the future yields the stored name.
+
+    The storage may pick a different name if ``name`` is taken.
+    """
+    return _get_executor().submit(default_storage.save, name, content)
+
+
+def url(name: str) -> str:
+    return default_storage.url(name)
+
+
+def is_local() -> bool:
+    """True when media lives on this server's disk under MEDIA_ROOT."""
+    return isinstance(default_storage, FileSystemStorage)
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-17 10:40
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_likes_count(apps, schema_editor):
+    Photo = apps.get_model('albums', 'Photo')
+    PhotoLike = apps.get_model('albums', 'PhotoLike')
+    like_totals = (
+        PhotoLike.objects.filter(photo=OuterRef('pk'))
+        .order_by()
+        .values('photo')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    Photo.objects.update(likes_count=Coalesce(Subquery(like_totals), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('albums', '0012_uploadjob_uploadjobfile'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_likes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-17 11:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('albums', '0013_backfill_photo_likes_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='album',
+            index=models.Index(fields=['owner', '-created_at'], name='albums_albu_owner_i_d27656_idx'),
+        ),
+    ]
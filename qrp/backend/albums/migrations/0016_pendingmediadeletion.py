@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-17 13:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('albums', '0015_mediaasset'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingMediaDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=500, unique=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_run_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['next_run_at'],
+                'indexes': [models.Index(fields=['next_run_at'], name='albums_pend_next_ru_13a0ed_idx')],
+            },
+        ),
+    ]
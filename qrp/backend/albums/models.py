@@ -1,5 +1,8 @@
+import uuid
+
 from django.db import models
 from django.db.models import Q
+from django.utils import timezone
 from django.utils.text import slugify
 from django.contrib.auth.models import User
 from django.core.mail import send_mail
@@ -26,6 +29,12 @@ class Album(models.Model):
     allow_downloads = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of an owner's albums (MyAlbumsView).
+            models.Index(fields=['owner', '-created_at']),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.slug:
             base = slugify(self.names)
@@ -340,3 +349,127 @@ class ContactMessage(models.Model):
 
     def __str__(self):
         return f"{self.full_name} - {self.email} ({self.status})"
+
+
+class UploadJob(models.Model):
+    """A batch of uploaded images processed in the background (async upload mode)."""
+    KIND_CHOICES = [
+        ('album', 'Album Photos'),
+        ('portfolio', 'Portfolio Images'),
+        ('service', 'Service Gallery Images'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_jobs')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    # PortfolioCategory id or Service id, depending on kind.
+    target_id = models.PositiveIntegerField(null=True, blank=True)
+    # Storage directory that album derivatives are written to.
+    output_dir = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} upload {self.id} ({self.status})"
+
+
+class UploadJobFile(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    job = models.ForeignKey(UploadJob, related_name='files', on_delete=models.CASCADE)
+    index = models.PositiveIntegerField()
+    original_name = models.CharField(max_length=255)
+    # Raw upload, removed once processed.
+    source = models.FileField(upload_to='uploads/pending/%Y/%m/', blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    # Album: relative url/thumbnail_url/medium_url. Portfolio/service: {'id': <created object id>}.
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['index']
+        unique_together = ('job', 'index')
+
+    def __str__(self):
+        return f"{self.original_name} ({self.status})"
+
+
+class MediaAsset(models.Model):
+    """A stored file and the number of model fields that point at it.
+
+    Maintained by albums.media_registry; see that module for the rules.
+    """
+    # MEDIA_ROOT-relative storage path, as stored in FileField.name.
+    path = models.CharField(max_length=500, unique=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    size = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['path']
+
+    def __str__(self):
+        return f"{self.path} ({self.ref_count} references)"
+
+
+class PendingMediaDeletion(models.Model):
+    """A stored file waiting to be deleted; see albums.media_deletions."""
+    # MEDIA_ROOT-relative storage path.
+    path = models.CharField(max_length=500, unique=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_run_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['next_run_at']
+        indexes = [
+            models.Index(fields=['next_run_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.path} (attempts: {self.attempts})"
+
+
+class OutboxEmail(models.Model):
+    """An email waiting to be sent; see albums.outbox."""
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254)
+    # List of recipient addresses.
+    to = models.JSONField(default=list)
+    attempts = models.PositiveIntegerField(default=0)
+    next_run_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['next_run_at']
+        indexes = [
+            models.Index(fields=['next_run_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} (attempts: {self.attempts})"
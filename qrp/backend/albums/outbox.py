@@ -0,0 +1,190 @@
+"""DB-backed outbox for outgoing email.
+
+Request handlers don't talk to the mail server. They call enqueue() inside
+their transaction, so an email is stored only if the change that caused it
+commits. A worker then sends due rows in batches over a single mail
+connection (one SMTP login per batch instead of one per message). A failed
+send is retried with exponential backoff. After OUTBOX_MAX_ATTEMPTS failures
+a row stops being retried and stays in the table with its last error. Sent
+rows are deleted.
+
+As with albums.media_deletions, the worker is either a background thread in
+the web process (started on demand) or the send_outbox management command.
+Claiming leases rows, so several workers can run side by side. A worker that
+dies mid-batch leaves its rows to be picked up again once the lease expires,
+so in rare cases a message is sent twice.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+# Claimed rows become due again after this long if their worker died.
+LEASE_SECONDS = 5 * 60
+
+_wake_event = threading.Event()
+_worker_started = False
+_worker_lock = threading.Lock()
+
+
+def _max_attempts() -> int:
+    return getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 8)
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(3600, 30 * 2 ** (attempts - 1)))
+
+
+def enqueue(subject: str, body: str, to, html_body: str = '', from_email: str | None = None) -> OutboxEmail:
+    """Queue one email; it is sent after the surrounding transaction commits."""
+    max_length = OutboxEmail._meta.get_field('subject').max_length
+    # Savepoint: a caller that swallows a failure here keeps a usable transaction.
+    with transaction.atomic():
+        email = OutboxEmail.objects.create(
+            # Header values can't contain line breaks.
+            subject=' '.join(subject.split())[:max_length],
+            body=body,
+            html_body=html_body or '',
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            to=list(to),
+        )
+    transaction.on_commit(wake_worker)
+    return email
+
+
+def wake_worker() -> None:
+    """Signal that email is due, starting the in-process worker if enabled."""
+    if getattr(settings, 'OUTBOX_IN_PROCESS_WORKER', True):
+        _ensure_worker()
+    _wake_event.set()
+
+
+def _ensure_worker() -> None:
+    """Start a single background thread that drains the outbox in this process."""
+    global _worker_started
+
+    if _worker_started:
+        return
+
+    with _worker_lock:
+        if _worker_started:
+            return
+
+        poll_interval = getattr(settings, 'OUTBOX_POLL_INTERVAL', 60)
+
+        def worker():
+            while True:
+                _wake_event.clear()
+                try:
+                    send_pending()
+                except Exception:
+                    logger.exception("Outbox worker iteration failed")
+                finally:
+                    close_old_connections()
+                _wake_event.wait(timeout=poll_interval)
+
+        thread = threading.Thread(target=worker, name='outbox-worker', daemon=True)
+        thread.start()
+        _worker_started = True
+
+
+def claim_due(batch_size: int) -> list[OutboxEmail]:
+    """Lease up to ``batch_size`` due emails to this worker."""
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(next_run_at__lte=now, attempts__lt=_max_attempts())
+            .order_by('next_run_at', 'pk')[:batch_size]
+        )
+        if rows:
+            OutboxEmail.objects.filter(pk__in=[row.pk for row in rows]).update(
+                next_run_at=now + timedelta(seconds=LEASE_SECONDS)
+            )
+    return rows
+
+
+def _build_message(row: OutboxEmail, connection) -> EmailMultiAlternatives:
+    message = EmailMultiAlternatives(
+        row.subject, row.body, row.from_email, row.to, connection=connection
+    )
+    if row.html_body:
+        message.attach_alternative(row.html_body, 'text/html')
+    return message
+
+
+def process_batch(batch_size: int | None = None) -> int:
+    """Claim one batch of due emails and send it over one connection; returns rows handled."""
+    batch_size = batch_size or getattr(settings, 'OUTBOX_BATCH_SIZE', 50)
+    rows = claim_due(batch_size)
+    if not rows:
+        return 0
+
+    sent = []
+    failed = []
+    now = timezone.now()
+
+    def fail(row, exc):
+        row.attempts += 1
+        row.last_error = str(exc)
+        row.next_run_at = now + _retry_delay(row.attempts)
+        failed.append(row)
+        logger.warning(
+            "Unable to send email %s to %s (attempt %s/%s): %s",
+            row.pk,
+            ', '.join(row.to),
+            row.attempts,
+            _max_attempts(),
+            exc,
+        )
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        for row in rows:
+            fail(row, exc)
+    else:
+        reconnect = False
+        try:
+            for row in rows:
+                try:
+                    if reconnect:
+                        connection.close()
+                        connection.open()
+                        reconnect = False
+                    _build_message(row, connection).send()
+                except Exception as exc:
+                    fail(row, exc)
+                    # The server may have dropped us; use a fresh connection for the rest.
+                    reconnect = True
+                    continue
+                sent.append(row.pk)
+        finally:
+            connection.close()
+
+    OutboxEmail.objects.filter(pk__in=sent).delete()
+    if failed:
+        OutboxEmail.objects.bulk_update(failed, ['attempts', 'last_error', 'next_run_at'])
+    return len(rows)
+
+
+def send_pending(max_batches=None) -> int:
+    """Send due emails until none are left (or max_batches ran)."""
+    handled = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        count = process_batch()
+        if not count:
+            break
+        handled += count
+        batches += 1
+    return handled
@@ -3,6 +3,11 @@ from rest_framework import serializers
 from django.conf import settings
 from django.db import transaction
 from django.db.models import Count
+from django.urls import reverse
+from . import media_deletions, media_registry
+from .archive import invalidate_album_archive, schedule_album_archive
+from .client_ip import get_client_ip
+from .signals import deferred_photo_cleanup
 from .models import (
     Album,
     Photo,
@@ -21,6 +26,7 @@ from .models import (
     StudioContactInfo,
     SocialLink,
     ContactMessage,
+    UploadJob,
 )
 
 
@@ -32,6 +38,9 @@ class IntegerPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
         return super().to_internal_value(data)
 
 
+# Rows per statement for bulk photo inserts/updates.
+PHOTO_BATCH_SIZE = 500
+
 PHONE_REGEX = re.compile(r'^\+?[0-9\s\-\(\)]{7,20}$')
 
 
@@ -90,6 +99,20 @@ class GuestMessageSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
+def photo_payload(p, request, liked_photo_ids):
+    """JSON for one album photo, shared by album detail and the paged photo list."""
+    return {
+        'url': request.build_absolute_uri(p.url) if request and not p.url.startswith('http') else p.url,
+        'thumbnail_url': request.build_absolute_uri(p.thumbnail_url) if request and p.thumbnail_url and not p.thumbnail_url.startswith('http') else p.thumbnail_url,
+        'medium_url': request.build_absolute_uri(p.medium_url) if request and p.medium_url and not p.medium_url.startswith('http') else p.medium_url,
+        'likes_count': p.likes_count,
+        'id': p.id,
+        'is_liked': p.id in liked_photo_ids,
+        'width': p.width,
+        'height': p.height,
+    }
+
+
 class AlbumListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for album lists"""
     owner_username = serializers.CharField(
@@ -110,7 +133,7 @@ class AlbumListSerializer(serializers.ModelSerializer):
     def get_is_owner(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.owner == request.user
+            return obj.owner_id == request.user.id
         return False
 
     def get_url(self, obj):
@@ -131,18 +154,47 @@ class AlbumListSerializer(serializers.ModelSerializer):
         return f"{base_url}/?album={encoded_slug}"
 
     def get_photo_count(self, obj):
+        # List views annotate the count (see albums.views._album_list_queryset).
+        if hasattr(obj, 'photo_count'):
+            return obj.photo_count
         return obj.photos.count()
 
     def get_cover_photo(self, obj):
         request = self.context.get('request')
-        photos = obj.photos.all()[:1]
-        if photos:
-            first_photo = photos[0]
-            return {
-                'url': request.build_absolute_uri(first_photo.url) if request and not first_photo.url.startswith('http') else first_photo.url,
-                'thumbnail_url': request.build_absolute_uri(first_photo.thumbnail_url) if request and first_photo.thumbnail_url and not first_photo.thumbnail_url.startswith('http') else first_photo.thumbnail_url,
-            }
-        return None
+        if hasattr(obj, 'cover_url'):
+            cover_url, cover_thumbnail_url = obj.cover_url, obj.cover_thumbnail_url or ''
+        else:
+            first_photo = obj.photos.order_by('order', 'id').only('url', 'thumbnail_url').first()
+            if first_photo is None:
+                return None
+            cover_url, cover_thumbnail_url = first_photo.url, first_photo.thumbnail_url
+        if not cover_url:
+            return None
+        return {
+            'url': request.build_absolute_uri(cover_url) if request and not cover_url.startswith('http') else cover_url,
+            'thumbnail_url': request.build_absolute_uri(cover_thumbnail_url) if request and cover_thumbnail_url and not cover_thumbnail_url.startswith('http') else cover_thumbnail_url,
+        }
+
+
+class AlbumSummarySerializer(AlbumListSerializer):
+    """Album header without photos or messages: metadata and counts only."""
+    message_count = serializers.SerializerMethodField(read_only=True)
+    photos_url = serializers.SerializerMethodField(read_only=True)
+
+    class Meta(AlbumListSerializer.Meta):
+        fields = AlbumListSerializer.Meta.fields + [
+            'description', 'allow_downloads', 'message_count', 'photos_url'
+        ]
+
+    def get_message_count(self, obj):
+        if hasattr(obj, 'message_count'):
+            return obj.message_count
+        return obj.messages.count()
+
+    def get_photos_url(self, obj):
+        request = self.context.get('request')
+        path = reverse('album-photos', kwargs={'slug': obj.slug})
+        return request.build_absolute_uri(path) if request else path
 
 
 class AlbumSerializer(serializers.ModelSerializer):
@@ -191,10 +243,11 @@ class AlbumSerializer(serializers.ModelSerializer):
 
     def get_photos_out(self, obj):
         request = self.context.get('request')
-        user_ip = self.get_client_ip(request) if request else None
+        user_ip = get_client_ip(request)
 
-        # Prefetch likes to avoid N+1 queries
-        photos = obj.photos.prefetch_related('likes').all()
+        # Served from the view's photos prefetch; like totals are denormalized
+        # into Photo.likes_count, so no PhotoLike rows are loaded here.
+        photos = obj.photos.all()
 
         # Get all liked photo IDs in one query
         liked_photo_ids = set()
@@ -206,29 +259,7 @@ class AlbumSerializer(serializers.ModelSerializer):
                 ).values_list('photo_id', flat=True)
             )
 
-        photos_data = []
-        for p in photos:
-            photos_data.append({
-                'url': request.build_absolute_uri(p.url) if request and not p.url.startswith('http') else p.url,
-                'thumbnail_url': request.build_absolute_uri(p.thumbnail_url) if request and p.thumbnail_url and not p.thumbnail_url.startswith('http') else p.thumbnail_url,
-                'medium_url': request.build_absolute_uri(p.medium_url) if request and p.medium_url and not p.medium_url.startswith('http') else p.medium_url,
-                'likes_count': p.likes.count(),
-                'id': p.id,
-                'is_liked': p.id in liked_photo_ids,
-                'width': p.width,
-                'height': p.height,
-            })
-        return photos_data
-
-    def get_client_ip(self, request):
-        if not request:
-            return None
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return [photo_payload(p, request, liked_photo_ids) for p in photos]
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -241,19 +272,26 @@ class AlbumSerializer(serializers.ModelSerializer):
         album = Album.objects.create(**validated_data)
 
         # Handle new format with thumbnail/medium URLs
+        photos = []
         for idx, photo_data in enumerate(photos_data):
             if isinstance(photo_data, str):
                 # Old format: just URL
-                Photo.objects.create(album=album, order=idx, url=photo_data)
+                photos.append(Photo(album=album, order=idx, url=photo_data))
             else:
                 # New format: dict with url, thumbnail_url, medium_url
-                Photo.objects.create(
+                photos.append(Photo(
                     album=album,
                     order=idx,
                     url=photo_data.get('url', photo_data),
                     thumbnail_url=photo_data.get('thumbnail_url', ''),
                     medium_url=photo_data.get('medium_url', ''),
-                )
+                ))
+        Photo.objects.bulk_create(photos, batch_size=PHOTO_BATCH_SIZE)
+        media_registry.acquire(
+            media_registry.photo_paths(url for p in photos for url in (p.url, p.thumbnail_url, p.medium_url))
+        )
+        if photos_data:
+            transaction.on_commit(lambda: schedule_album_archive(album.id))
         return album
 
     def update(self, instance, validated_data):
@@ -268,9 +306,13 @@ class AlbumSerializer(serializers.ModelSerializer):
             # That caused media files to be removed from disk even when the user
             # was only adding new photos.
             if photos_data is None:
+                if 'allow_downloads' in validated_data:
+                    transaction.on_commit(lambda: invalidate_album_archive(instance.id))
                 return instance
 
-            existing_photos = list(instance.photos.all())
+            existing_photos = list(
+                instance.photos.only('id', 'album_id', 'order', 'url', 'thumbnail_url', 'medium_url')
+            )
             existing_by_id = {p.id: p for p in existing_photos}
             # Fallback matching by URL (useful if client doesn't send ids)
             existing_by_url = {}
@@ -278,6 +320,14 @@ class AlbumSerializer(serializers.ModelSerializer):
                 existing_by_url.setdefault(p.url, []).append(p)
 
             kept_ids = set()
+            new_photos = []
+            changed_photos = []
+            changed_fields = set()
+            # URLs gained, and URLs dropped by replacement or removal, one
+            # entry per reference. Dropped files are queued for deletion and
+            # removed if nothing references them any more.
+            acquired_urls = []
+            released_urls = []
 
             def normalize_photo_item(item):
                 if isinstance(item, str):
@@ -297,41 +347,68 @@ class AlbumSerializer(serializers.ModelSerializer):
                 photo_obj = None
 
                 # Prefer stable matching by id
-                if item.get('id') in existing_by_id:
+                if item.get('id') in existing_by_id and item['id'] not in kept_ids:
                     photo_obj = existing_by_id[item['id']]
 
                 # Fallback matching by url
-                if photo_obj is None and item.get('url') and item['url'] in existing_by_url and existing_by_url[item['url']]:
-                    photo_obj = existing_by_url[item['url']].pop(0)
+                if photo_obj is None and item.get('url'):
+                    candidates = existing_by_url.get(item['url'], [])
+                    while candidates and candidates[0].id in kept_ids:
+                        candidates.pop(0)
+                    if candidates:
+                        photo_obj = candidates.pop(0)
 
                 if photo_obj is None:
                     # New photo
-                    Photo.objects.create(
+                    new_photos.append(Photo(
                         album=instance,
                         order=idx,
                         url=item.get('url', ''),
                         thumbnail_url=item.get('thumbnail_url', ''),
                         medium_url=item.get('medium_url', ''),
-                    )
+                    ))
+                    acquired_urls.extend(item.get(field, '') for field in ('url', 'thumbnail_url', 'medium_url'))
                 else:
                     kept_ids.add(photo_obj.id)
                     # Update order + urls (if the client changed them)
                     changed = False
                     if photo_obj.order != idx:
                         photo_obj.order = idx
+                        changed_fields.add('order')
                         changed = True
                     for field in ('url', 'thumbnail_url', 'medium_url'):
                         new_val = item.get(field, '')
-                        if new_val and getattr(photo_obj, field) != new_val:
+                        old_val = getattr(photo_obj, field)
+                        if new_val and old_val != new_val:
+                            if old_val:
+                                released_urls.append(old_val)
+                            acquired_urls.append(new_val)
                             setattr(photo_obj, field, new_val)
+                            changed_fields.add(field)
                             changed = True
                     if changed:
-                        photo_obj.save()
+                        changed_photos.append(photo_obj)
 
             # Delete only photos that were actually removed from the submitted list
-            for p in existing_photos:
-                if p.id not in kept_ids:
-                    p.delete()
+            removed = [p for p in existing_photos if p.id not in kept_ids]
+            for p in removed:
+                released_urls.extend(u for u in (p.url, p.thumbnail_url, p.medium_url) if u)
+
+            # Set-based writes: bulk_update/bulk_create bypass the per-photo
+            # signals, so the media registry and deletion queue are updated
+            # here for the whole batch.
+            if removed:
+                with deferred_photo_cleanup():
+                    Photo.objects.filter(id__in=[p.id for p in removed]).delete()
+            if changed_photos:
+                Photo.objects.bulk_update(changed_photos, sorted(changed_fields), batch_size=PHOTO_BATCH_SIZE)
+            if new_photos:
+                Photo.objects.bulk_create(new_photos, batch_size=PHOTO_BATCH_SIZE)
+            released_paths = media_registry.photo_paths(released_urls)
+            media_registry.acquire(media_registry.photo_paths(acquired_urls))
+            media_registry.release(released_paths)
+            media_deletions.enqueue(released_paths)
+            transaction.on_commit(lambda: invalidate_album_archive(instance.id))
 
         return instance
 
@@ -446,13 +523,22 @@ class ServiceSerializer(serializers.ModelSerializer):
         model = Service
         fields = ['id', 'title', 'description', 'icon', 'order', 'gallery_images', 'gallery_count', 'is_active']
 
+    def _gallery(self, obj):
+        # Views attach the ordered gallery with Prefetch(to_attr=...); see
+        # albums.views._with_gallery_images. Otherwise load it once per object.
+        images = getattr(obj, 'ordered_gallery_images', None)
+        if images is None:
+            images = list(obj.gallery_images.order_by('order', 'created_at'))
+            obj.ordered_gallery_images = images
+        return images
+
     def get_gallery_images(self, obj):
         request = self.context.get('request')
-        images = obj.gallery_images.filter().order_by('order')
+        images = self._gallery(obj)
         return [request.build_absolute_uri(img.image.url) if request else img.image.url for img in images]
 
     def get_gallery_count(self, obj):
-        return obj.gallery_images.count()
+        return len(self._gallery(obj))
 
 
 class TestimonialSerializer(serializers.ModelSerializer):
@@ -628,3 +714,71 @@ class ContactMessageSerializer(serializers.ModelSerializer):
         
     def validate_project_details(self, value):
         return value.strip()
+
+
+class UploadJobSerializer(serializers.ModelSerializer):
+    """Progress and results of an asynchronous upload job"""
+    job_id = serializers.UUIDField(source='id', read_only=True)
+    total = serializers.SerializerMethodField()
+    processed = serializers.SerializerMethodField()
+    failed = serializers.SerializerMethodField()
+    files = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadJob
+        fields = [
+            'job_id', 'kind', 'status', 'total', 'processed', 'failed', 'error',
+            'created_at', 'updated_at', 'finished_at', 'files', 'images',
+        ]
+
+    def _files(self, obj):
+        # files is prefetched by the view; list() keeps every method on one query.
+        return list(obj.files.all())
+
+    def _absolute(self, url):
+        request = self.context.get('request')
+        if request and url and not url.startswith('http'):
+            return request.build_absolute_uri(url)
+        return url
+
+    def get_total(self, obj):
+        return len(self._files(obj))
+
+    def get_processed(self, obj):
+        return sum(1 for f in self._files(obj) if f.status in ('done', 'failed'))
+
+    def get_failed(self, obj):
+        return sum(1 for f in self._files(obj) if f.status == 'failed')
+
+    def get_files(self, obj):
+        files = []
+        for f in self._files(obj):
+            result = f.result
+            if obj.kind == 'album' and result:
+                result = {key: self._absolute(value) for key, value in result.items()}
+            files.append({
+                'index': f.index,
+                'name': f.original_name,
+                'status': f.status,
+                'error': f.error or None,
+                'result': result,
+            })
+        return files
+
+    def get_images(self, obj):
+        """Finished images in the same shape as the synchronous upload response."""
+        done = [f for f in self._files(obj) if f.status == 'done' and f.result]
+
+        if obj.kind == 'album':
+            return [
+                {key: self._absolute(f.result.get(key, '')) for key in ('url', 'thumbnail_url', 'medium_url')}
+                for f in done
+            ]
+
+        ids = [f.result.get('id') for f in done]
+        if obj.kind == 'portfolio':
+            images = PortfolioImage.objects.filter(id__in=ids).select_related('category').order_by('order')
+            return PortfolioImageSerializer(images, many=True, context=self.context).data
+        images = ServiceGalleryImage.objects.filter(id__in=ids).order_by('order')
+        return ServiceGalleryImageSerializer(images, many=True, context=self.context).data
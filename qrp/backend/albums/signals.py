@@ -1,16 +1,14 @@
-import logging
-import os
-import queue
 import threading
-import time
-from urllib.parse import urlparse
+from contextlib import contextmanager
 
-from django.conf import settings
 from django.db import transaction
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 
+from . import media_deletions, media_registry
+from .archive import invalidate_album_archive, remove_album_archives
 from .models import (
+    Album,
     MediaItem,
     Photo,
     PortfolioImage,
@@ -19,318 +17,237 @@ from .models import (
     Video,
 )
 
-logger = logging.getLogger(__name__)
+# Set while set-based photo deletes run, so the per-photo handlers skip
+# their lookups; the caller releases and queues the files in one batch.
+_deferred_cleanup = threading.local()
 
+PHOTO_URL_FIELDS = media_registry.PHOTO_URL_FIELDS
 
-_delete_queue: "queue.PriorityQueue[tuple[float, object, str, int]]" = queue.PriorityQueue()
-_delete_worker_started = False
-_delete_worker_lock = threading.Lock()
 
+def _delete_instance_files(instance) -> None:
+    """Release a deleted instance's files and queue them for deletion.
 
-_FILEFIELD_REFERENCES = [
-    (Testimonial, 'avatar'),
-    (ServiceGalleryImage, 'image'),
-    (PortfolioImage, 'image'),
-    (Video, 'video_file'),
-    (Video, 'thumbnail'),
-    (MediaItem, 'file'),
-]
-
-
-def _relative_media_path_from_url(url: str) -> str | None:
-    """Return storage-relative path for MEDIA_URL-backed URLs."""
-    if not url:
-        return None
-
-    parsed = urlparse(url)
-    request_path = parsed.path.lstrip('/')
-    media_prefix = (settings.MEDIA_URL or '').lstrip('/')
-
-    if media_prefix and request_path.startswith(media_prefix):
-        relative_path = request_path[len(media_prefix):]
-        return relative_path.lstrip('/')
-
-    return None
-
-
-def _cleanup_empty_dirs(start_dir: str, media_root: str) -> None:
-    """Remove empty directories up to MEDIA_ROOT."""
-    current_dir = os.path.abspath(start_dir)
-    media_root = os.path.abspath(media_root)
-
-    while current_dir.startswith(media_root) and current_dir != media_root:
-        try:
-            os.rmdir(current_dir)
-        except OSError:
-            break
-        current_dir = os.path.dirname(current_dir)
-
-
-def _ensure_delete_worker() -> None:
-    """Start a single background worker to retry deletions on Windows locks."""
-    global _delete_worker_started
-
-    if _delete_worker_started:
-        return
-
-    with _delete_worker_lock:
-        if _delete_worker_started:
-            return
-
-        def worker():
-            while True:
-                run_at, storage, storage_name, attempt = _delete_queue.get()
-                try:
-                    now = time.time()
-                    if run_at > now:
-                        time.sleep(run_at - now)
-                    _safe_storage_delete(storage, storage_name, attempt=attempt)
-                finally:
-                    _delete_queue.task_done()
-
-        thread = threading.Thread(target=worker, name='media-delete-worker', daemon=True)
-        thread.start()
-        _delete_worker_started = True
-
-
-def _safe_storage_delete(storage, storage_name: str, attempt: int = 0) -> None:
-    """Delete via Django storage.
-
-    On Windows, video files can be temporarily locked by another process (browser,
-    antivirus, preview, etc.). For PermissionError, this function schedules
-    background retries with backoff.
+    The deletion worker keeps any file that something still references.
     """
-    if not storage_name:
-        return
-
-    # Storage.delete() is the most portable option (works for local + S3, etc.)
-    try:
-        storage.delete(storage_name)
-    except PermissionError as exc:
-        # Exponential-ish backoff, max ~2 minutes total.
-        next_attempt = attempt + 1
-        if next_attempt <= 8:
-            delay = min(30.0, 0.5 * (2 ** attempt))
-            logger.warning(
-                "Unable to delete stored file %s (locked). Retrying in %.1fs (attempt %s/8): %s",
-                storage_name,
-                delay,
-                next_attempt,
-                exc,
-            )
-            _ensure_delete_worker()
-            _delete_queue.put((time.time() + delay, storage, storage_name, next_attempt))
-        else:
-            logger.warning("Unable to delete stored file %s after retries: %s", storage_name, exc)
-        return
-    except Exception as exc:
-        logger.warning("Unable to delete stored file %s: %s", storage_name, exc)
-        return
-
-    # Best-effort: remove empty directories for local FileSystemStorage
-    try:
-        absolute_path = storage.path(storage_name)
-    except Exception:
-        return
-
-    media_root = os.path.abspath(settings.MEDIA_ROOT)
-    try:
-        _cleanup_empty_dirs(os.path.dirname(os.path.abspath(absolute_path)), media_root)
-    except Exception:
-        return
+    paths = media_registry.instance_paths(instance)
+    media_registry.release(paths)
+    media_deletions.enqueue(paths)
 
 
-def _delete_media_file_by_url(url: str) -> None:
-    relative_path = _relative_media_path_from_url(url)
-    if not relative_path:
+def _remember_file_fields(sender, instance, field_names: list[str]) -> None:
+    """Stash the stored file names an update is about to replace (pre_save)."""
+    instance._previous_file_names = {}
+    if not instance.pk:
         return
 
-    media_root = os.path.abspath(settings.MEDIA_ROOT)
-    absolute_path = os.path.abspath(os.path.join(media_root, relative_path))
-
-    # Safety: prevent path traversal deletes
-    if not absolute_path.startswith(media_root):
-        return
+    previous = sender.objects.filter(pk=instance.pk).values_list(*field_names).first()
+    if previous is not None:
+        instance._previous_file_names = dict(zip(field_names, previous))
 
-    if os.path.exists(absolute_path):
-        try:
-            os.remove(absolute_path)
-            _cleanup_empty_dirs(os.path.dirname(absolute_path), media_root)
-        except OSError as exc:
-            logger.warning("Unable to delete media file %s: %s", absolute_path, exc)
 
+def _update_file_field_references(instance, field_names: list[str]) -> None:
+    """Move registry references to the saved files; queue replaced files.
 
-def _delete_instance_files(instance, field_names: list[str]) -> None:
-    """Delete stored files for the given instance fields."""
+    Safety: the deletion worker only removes an old file if nothing
+    references the same stored file name any more.
+    """
+    previous = getattr(instance, '_previous_file_names', None) or {}
+    acquired = []
+    released = []
     for field_name in field_names:
-        file_field = getattr(instance, field_name, None)
-        file_name = getattr(file_field, 'name', '')
-        if not file_field or not file_name:
+        old_name = previous.get(field_name) or ''
+        new_name = getattr(getattr(instance, field_name, None), 'name', '') or ''
+        if old_name == new_name:
             continue
+        if new_name:
+            acquired.append(media_registry.path_from_file_name(new_name))
+        if old_name:
+            released.append(media_registry.path_from_file_name(old_name))
 
-        # If something accidentally stored an absolute URL in the FileField name,
-        # fall back to URL-based deletion.
-        if isinstance(file_name, str) and (file_name.startswith('http://') or file_name.startswith('https://')):
-            _delete_media_file_by_url(file_name)
-            continue
+    media_registry.acquire(acquired)
+    media_registry.release(released)
+    media_deletions.enqueue(released)
 
-        storage = getattr(file_field, 'storage', None)
-        if storage is None:
-            continue
 
-        transaction.on_commit(lambda s=storage, n=file_name: _safe_storage_delete(s, n))
+@receiver(post_delete, sender=Testimonial)
+def delete_testimonial_media(sender, instance, **kwargs):
+    _delete_instance_files(instance)
 
 
-def _is_file_referenced_anywhere(storage_name: str, *, exclude_model=None, exclude_pk=None) -> bool:
-    """Conservative check: do NOT delete if any model still references the file.
+@receiver(post_delete, sender=ServiceGalleryImage)
+def delete_service_gallery_media(sender, instance, **kwargs):
+    _delete_instance_files(instance)
 
-    Use exclude_model/exclude_pk when checking old files during an update, because
-    the current DB row still references the old file until the save completes.
-    """
-    if not storage_name:
-        return True
 
-    for model_cls, field_name in _FILEFIELD_REFERENCES:
-        qs = model_cls.objects.filter(**{field_name: storage_name})
-        if exclude_model is model_cls and exclude_pk is not None:
-            qs = qs.exclude(pk=exclude_pk)
-        if qs.exists():
-            return True
+@receiver(post_delete, sender=PortfolioImage)
+def delete_portfolio_media(sender, instance, **kwargs):
+    _delete_instance_files(instance)
 
-    # Extra safety: some systems store absolute URLs for Photo; use endswith checks.
-    for field_name in ('url', 'medium_url', 'thumbnail_url'):
-        qs = Photo.objects.filter(**{f"{field_name}__endswith": storage_name})
-        if exclude_model is Photo and exclude_pk is not None:
-            qs = qs.exclude(pk=exclude_pk)
-        if qs.exists():
-            return True
 
-    return False
+@receiver(post_delete, sender=Video)
+def delete_video_media(sender, instance, **kwargs):
+    _delete_instance_files(instance)
 
 
-def _delete_replaced_file_field(sender, instance, field_name: str) -> None:
-    """Delete previous file when a FileField/ImageField is replaced.
+@receiver(post_delete, sender=MediaItem)
+def delete_media_item_file(sender, instance, **kwargs):
+    _delete_instance_files(instance)
 
-    Safety: only deletes the old file if no other model still references the same
-    stored file name.
-    """
-    if not instance.pk:
-        return
 
-    try:
-        previous = sender.objects.get(pk=instance.pk)
-    except sender.DoesNotExist:
-        return
+@contextmanager
+def deferred_photo_cleanup():
+    """Skip per-photo file cleanup in the Photo signal handlers.
 
-    old_field = getattr(previous, field_name, None)
-    new_field = getattr(instance, field_name, None)
+    The caller takes over: release the photos' paths in the media registry
+    and queue them with media_deletions.enqueue().
+    """
+    depth = getattr(_deferred_cleanup, 'depth', 0)
+    _deferred_cleanup.depth = depth + 1
+    try:
+        yield
+    finally:
+        _deferred_cleanup.depth = depth
 
-    old_name = getattr(old_field, 'name', '')
-    new_name = getattr(new_field, 'name', '')
 
-    if not old_name or old_name == new_name:
-        return
+def _photo_cleanup_deferred(instance=None) -> bool:
+    if getattr(_deferred_cleanup, 'depth', 0) > 0:
+        return True
+    # Photos removed by an album cascade are cleaned up with the album.
+    deleting = getattr(_deferred_cleanup, 'albums', None)
+    return bool(deleting) and instance is not None and instance.album_id in deleting
 
-    # If anyone references it, keep it.
-    if _is_file_referenced_anywhere(old_name, exclude_model=sender, exclude_pk=instance.pk):
-        return
 
-    storage = getattr(old_field, 'storage', None)
-    if storage is None:
+@receiver(post_delete, sender=Photo)
+def delete_photo_assets(sender, instance, **kwargs):
+    if _photo_cleanup_deferred(instance):
         return
 
-    # Delete after commit to avoid weird states during transaction.
-    transaction.on_commit(lambda s=storage, n=old_name: _safe_storage_delete(s, n))
-
-
-@receiver(post_delete, sender=Testimonial)
-def delete_testimonial_media(sender, instance, **kwargs):
-    _delete_instance_files(instance, ['avatar'])
+    # Remove stored album files when either a photo or its parent album is deleted.
+    # Safety: the deletion worker keeps files that anything still references.
+    paths = media_registry.instance_paths(instance)
+    media_registry.release(paths)
+    media_deletions.enqueue(paths)
 
+    album_id = instance.album_id
+    transaction.on_commit(lambda: invalidate_album_archive(album_id))
 
-@receiver(post_delete, sender=ServiceGalleryImage)
-def delete_service_gallery_media(sender, instance, **kwargs):
-    _delete_instance_files(instance, ['image'])
 
+@receiver(pre_delete, sender=Album)
+def collect_album_photo_urls(sender, instance, **kwargs):
+    """Collect the album's photo files in one query before the cascade.
 
-@receiver(post_delete, sender=PortfolioImage)
-def delete_portfolio_media(sender, instance, **kwargs):
-    _delete_instance_files(instance, ['image'])
+    The per-photo handlers skip photos of this album; its files are released
+    and queued for the deletion worker in batches instead.
+    """
+    urls = []
+    for row in Photo.objects.filter(album_id=instance.pk).values_list(*PHOTO_URL_FIELDS):
+        urls.extend(url for url in row if url)
+    instance._released_photo_urls = urls
 
+    deleting = getattr(_deferred_cleanup, 'albums', None)
+    if deleting is None:
+        deleting = _deferred_cleanup.albums = set()
+    deleting.add(instance.pk)
 
-@receiver(post_delete, sender=Video)
-def delete_video_media(sender, instance, **kwargs):
-    _delete_instance_files(instance, ['video_file', 'thumbnail'])
 
+@receiver(post_delete, sender=Album)
+def delete_album_archives(sender, instance, **kwargs):
+    album_id = instance.pk
+    getattr(_deferred_cleanup, 'albums', set()).discard(album_id)
 
-@receiver(post_delete, sender=MediaItem)
-def delete_media_item_file(sender, instance, **kwargs):
-    _delete_instance_files(instance, ['file'])
+    urls = getattr(instance, '_released_photo_urls', None)
+    if urls:
+        paths = media_registry.photo_paths(urls)
+        media_registry.release(paths)
+        media_deletions.enqueue(paths)
+    transaction.on_commit(lambda: remove_album_archives(album_id))
 
 
-@receiver(post_delete, sender=Photo)
-def delete_photo_assets(sender, instance, **kwargs):
-    # Remove stored album files when either a photo or its parent album is deleted.
-    for field in ('url', 'thumbnail_url', 'medium_url'):
-        url_value = getattr(instance, field, '')
-        if not url_value:
-            continue
-
-        # Safety: if another Photo still references the same URL, keep the file.
-        if Photo.objects.filter(**{field: url_value}).exclude(pk=instance.pk).exists():
-            continue
+@receiver(pre_save, sender=Photo)
+def remember_photo_urls(sender, instance, **kwargs):
+    instance._previous_photo_urls = {}
+    if not instance.pk or _photo_cleanup_deferred(instance):
+        return
 
-        _delete_media_file_by_url(url_value)
+    previous = Photo.objects.filter(pk=instance.pk).values_list(*PHOTO_URL_FIELDS).first()
+    if previous is not None:
+        instance._previous_photo_urls = dict(zip(PHOTO_URL_FIELDS, previous))
 
 
-@receiver(pre_save, sender=Photo)
+@receiver(post_save, sender=Photo)
 def delete_replaced_photo_assets(sender, instance, **kwargs):
-    """When a Photo is edited and URLs change, remove the old files.
+    """When a Photo is edited and URLs change, queue the old files for deletion.
 
-    Safety: only deletes a file if no other Photo still references the same URL.
+    Safety: the deletion worker only removes a file if nothing references
+    the same file any more.
     """
-    if not instance.pk:
-        return
-
-    try:
-        previous = Photo.objects.get(pk=instance.pk)
-    except Photo.DoesNotExist:
+    if _photo_cleanup_deferred(instance):
         return
 
-    for field in ('url', 'thumbnail_url', 'medium_url'):
-        old_value = getattr(previous, field, '')
-        new_value = getattr(instance, field, '')
-
-        if not old_value or old_value == new_value:
+    previous = getattr(instance, '_previous_photo_urls', None) or {}
+    acquired = []
+    released = []
+    for field in PHOTO_URL_FIELDS:
+        old_value = previous.get(field) or ''
+        new_value = getattr(instance, field, '') or ''
+        if old_value == new_value:
             continue
+        if new_value:
+            acquired.append(new_value)
+        if old_value:
+            released.append(old_value)
 
-        if Photo.objects.filter(**{field: old_value}).exclude(pk=instance.pk).exists():
-            continue
-
-        _delete_media_file_by_url(old_value)
+    released_paths = media_registry.photo_paths(released)
+    media_registry.acquire(media_registry.photo_paths(acquired))
+    media_registry.release(released_paths)
+    media_deletions.enqueue(released_paths)
 
 
 @receiver(pre_save, sender=Testimonial)
+def remember_testimonial_media(sender, instance, **kwargs):
+    _remember_file_fields(sender, instance, ['avatar'])
+
+
+@receiver(post_save, sender=Testimonial)
 def delete_replaced_testimonial_media(sender, instance, **kwargs):
-    _delete_replaced_file_field(sender, instance, 'avatar')
+    _update_file_field_references(instance, ['avatar'])
 
 
 @receiver(pre_save, sender=ServiceGalleryImage)
+def remember_service_gallery_media(sender, instance, **kwargs):
+    _remember_file_fields(sender, instance, ['image'])
+
+
+@receiver(post_save, sender=ServiceGalleryImage)
 def delete_replaced_service_gallery_media(sender, instance, **kwargs):
-    _delete_replaced_file_field(sender, instance, 'image')
+    _update_file_field_references(instance, ['image'])
 
 
 @receiver(pre_save, sender=PortfolioImage)
+def remember_portfolio_media(sender, instance, **kwargs):
+    _remember_file_fields(sender, instance, ['image'])
+
+
+@receiver(post_save, sender=PortfolioImage)
 def delete_replaced_portfolio_media(sender, instance, **kwargs):
-    _delete_replaced_file_field(sender, instance, 'image')
+    _update_file_field_references(instance, ['image'])
 
 
 @receiver(pre_save, sender=Video)
+def remember_video_media(sender, instance, **kwargs):
+    _remember_file_fields(sender, instance, ['video_file', 'thumbnail'])
+
+
+@receiver(post_save, sender=Video)
 def delete_replaced_video_media(sender, instance, **kwargs):
-    _delete_replaced_file_field(sender, instance, 'video_file')
-    _delete_replaced_file_field(sender, instance, 'thumbnail')
+    _update_file_field_references(instance, ['video_file', 'thumbnail'])
 
 
 @receiver(pre_save, sender=MediaItem)
+def remember_media_item_file(sender, instance, **kwargs):
+    _remember_file_fields(sender, instance, ['file'])
+
+
+@receiver(post_save, sender=MediaItem)
 def delete_replaced_media_item_file(sender, instance, **kwargs):
-    _delete_replaced_file_field(sender, instance, 'file')
+    _update_file_field_references(instance, ['file'])
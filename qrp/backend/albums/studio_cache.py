@@ -0,0 +1,90 @@
+"""Versioned cache for the public studio landing page payload.
+
+StudioDataView caches its response under a key that includes a version
+number. Saving or deleting any model that feeds the payload bumps the
+version (after the transaction commits), so the next request rebuilds it
+and edits show up immediately. Unchanged snapshots live for
+STUDIO_DATA_CACHE_TIMEOUT seconds.
+
+Queryset.update() and bulk_create() send no signals; code using them on
+these models must call bump_studio_version() itself.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import (
+    MediaItem,
+    PortfolioCategory,
+    PortfolioImage,
+    Service,
+    ServiceGalleryImage,
+    SocialLink,
+    StudioContactInfo,
+    StudioContent,
+    StudioStat,
+    Testimonial,
+    Video,
+    VideoCategory,
+)
+
+VERSION_KEY = 'studio_data:version'
+
+STUDIO_MODELS = (
+    StudioContent,
+    StudioStat,
+    Service,
+    ServiceGalleryImage,
+    Testimonial,
+    PortfolioCategory,
+    PortfolioImage,
+    MediaItem,
+    Video,
+    VideoCategory,
+    StudioContactInfo,
+    SocialLink,
+)
+
+
+def studio_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a lost counter never reuses an old version.
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_studio_version() -> None:
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+
+
+def studio_payload_key(request) -> str:
+    # Payload URLs are absolute, so the scheme and host are part of the key.
+    return f"studio_data:{studio_version()}:{request.scheme}:{request.get_host()}"
+
+
+def get_cached_payload(key: str):
+    return cache.get(key)
+
+
+def set_cached_payload(key: str, payload) -> None:
+    # Store under the key the lookup used: a version bumped while the payload
+    # was being built must not label the old data as current.
+    timeout = getattr(settings, 'STUDIO_DATA_CACHE_TIMEOUT', 24 * 60 * 60)
+    cache.set(key, payload, timeout)
+
+
+def _invalidate(sender, **kwargs):
+    transaction.on_commit(bump_studio_version)
+
+
+for _model in STUDIO_MODELS:
+    post_save.connect(_invalidate, sender=_model, dispatch_uid=f'studio_cache_save_{_model.__name__}')
+    post_delete.connect(_invalidate, sender=_model, dispatch_uid=f'studio_cache_delete_{_model.__name__}')
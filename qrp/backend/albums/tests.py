@@ -0,0 +1,91 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .models import (
+    Service,
+    ServiceGalleryImage,
+    SocialLink,
+    StudioContactInfo,
+    Video,
+    VideoCategory,
+)
+
+# Models without migrations; their tables are created for the tests that need them.
+UNMIGRATED_MODELS = (VideoCategory, Video, StudioContactInfo, SocialLink)
+
+
+def add_services(count, images_per_service=3):
+    for index in range(count):
+        service = Service.objects.create(title=f'Service {index}', description='...', order=index)
+        for image_index in range(images_per_service):
+            ServiceGalleryImage.objects.create(
+                service=service, image=f'services/{index}-{image_index}.jpg', order=image_index
+            )
+
+
+class ServiceGalleryQueryCountTests(TestCase):
+    """Listing services must not issue a gallery query per service."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('studio'))
+
+    def _list_services(self):
+        response = self.client.get('/api/manage/services/')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_is_constant_in_number_of_services(self):
+        add_services(1)
+        with CaptureQueriesContext(connection) as single:
+            self._list_services()
+
+        add_services(9)
+        with self.assertNumQueries(len(single)):
+            response = self._list_services()
+
+        services = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual(len(services), 10)
+        self.assertTrue(all(service['gallery_count'] == 3 for service in services))
+
+
+class StudioPayloadQueryCountTests(TestCase):
+    """The uncached studio payload must not issue a gallery query per service."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Outside the class-wide transaction: SQLite can't alter schema inside one.
+        existing = set(connection.introspection.table_names())
+        cls.created_models = [model for model in UNMIGRATED_MODELS if model._meta.db_table not in existing]
+        with connection.schema_editor() as editor:
+            for model in cls.created_models:
+                editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            for model in reversed(cls.created_models):
+                editor.delete_model(model)
+
+    def _studio_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get('/api/studio/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_query_count_is_constant_in_number_of_services(self):
+        add_services(5)
+        few, _ = self._studio_queries()
+
+        add_services(45)
+        many, response = self._studio_queries()
+
+        self.assertEqual(few, many)
+        self.assertEqual(len(response.data['services']), 50)
@@ -0,0 +1,290 @@
+"""DB-backed queue for asynchronous upload processing.
+
+In async mode the upload endpoints only persist the raw files as an
+UploadJob with one UploadJobFile per file and return 202. A worker claims
+queued jobs and runs the ImageProcessor work through the image engine. The
+worker is either a background thread in the web process (started on demand)
+or the process_upload_jobs management command; both use the same claim
+protocol, so any number of them can run side by side.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.db import close_old_connections, models, transaction
+from django.utils import timezone
+
+from . import image_engine, media_storage
+from .models import (
+    PortfolioCategory,
+    PortfolioImage,
+    Service,
+    ServiceGalleryImage,
+    UploadJob,
+    UploadJobFile,
+)
+
+logger = logging.getLogger(__name__)
+
+
+_wake_event = threading.Event()
+_worker_started = False
+_worker_lock = threading.Lock()
+
+
+def new_album_upload_dir() -> str:
+    """Storage directory for one batch of album uploads."""
+    return f"albums/{int(time.time() * 1000)}"
+
+
+def start_album_derivatives(subdir: str, processed: dict) -> dict:
+    """Start saving process_image output under subdir through default storage.
+
+    Returns key -> future of the stored name; the three files are written
+    concurrently.
+    """
+    return {
+        key: media_storage.save_async(f"{subdir}/{processed[key].name}", processed[key])
+        for key in ('thumbnail', 'medium', 'full')
+    }
+
+
+def album_derivative_urls(pending: dict) -> dict:
+    """Wait for start_album_derivatives(); returns url/thumbnail_url/medium_url."""
+    names = {key: future.result() for key, future in pending.items()}
+    return {
+        'url': media_storage.url(names['full']),
+        'thumbnail_url': media_storage.url(names['thumbnail']),
+        'medium_url': media_storage.url(names['medium']),
+    }
+
+
+def write_album_derivatives(subdir: str, processed: dict) -> dict:
+    """Store process_image output under subdir and return its URLs.
+
+    URLs are MEDIA_URL-relative for local storage and absolute for remote
+    storages.
+    """
+    return album_derivative_urls(start_album_derivatives(subdir, processed))
+
+
+def enqueue_upload_job(owner, kind: str, files, target_id=None) -> UploadJob:
+    """Persist the uploaded files as a queued job and wake a worker after commit."""
+    with transaction.atomic():
+        job = UploadJob.objects.create(
+            owner=owner,
+            kind=kind,
+            target_id=target_id,
+            output_dir=new_album_upload_dir() if kind == 'album' else '',
+        )
+
+        job_files = []
+        for idx, f in enumerate(files):
+            original_name = os.path.basename(getattr(f, 'name', '') or '')[:255]
+            extension = os.path.splitext(original_name)[1].lower()[:10]
+            job_file = UploadJobFile(job=job, index=idx, original_name=original_name)
+            job_file.source.save(f"{job.id.hex}-{idx}{extension}", f, save=False)
+            job_files.append(job_file)
+        UploadJobFile.objects.bulk_create(job_files)
+
+        transaction.on_commit(wake_worker)
+    return job
+
+
+def wake_worker() -> None:
+    """Signal that new jobs exist, starting the in-process worker if enabled."""
+    if getattr(settings, 'UPLOAD_JOBS_IN_PROCESS_WORKER', True):
+        _ensure_worker()
+    _wake_event.set()
+
+
+def _ensure_worker() -> None:
+    """Start a single background thread that drains the queue in this process."""
+    global _worker_started
+
+    if _worker_started:
+        return
+
+    with _worker_lock:
+        if _worker_started:
+            return
+
+        poll_interval = getattr(settings, 'UPLOAD_JOBS_POLL_INTERVAL', 5)
+
+        def worker():
+            while True:
+                _wake_event.clear()
+                try:
+                    run_pending_jobs()
+                except Exception:
+                    logger.exception("Upload job worker iteration failed")
+                finally:
+                    close_old_connections()
+                _wake_event.wait(timeout=poll_interval)
+
+        thread = threading.Thread(target=worker, name='upload-job-worker', daemon=True)
+        thread.start()
+        _worker_started = True
+
+
+def requeue_stale_jobs() -> int:
+    """Return jobs whose worker stopped heartbeating (crash, deploy) to the queue."""
+    stale_after = getattr(settings, 'UPLOAD_JOBS_STALE_AFTER', 15 * 60)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale_ids = list(
+        UploadJob.objects.filter(status='processing', updated_at__lt=cutoff).values_list('id', flat=True)
+    )
+    if not stale_ids:
+        return 0
+
+    UploadJobFile.objects.filter(job_id__in=stale_ids, status='processing').update(status='queued')
+    return UploadJob.objects.filter(id__in=stale_ids, status='processing').update(
+        status='queued', updated_at=timezone.now()
+    )
+
+
+def claim_next_job() -> UploadJob | None:
+    """Atomically move the oldest queued job to processing and return it."""
+    while True:
+        job_id = (
+            UploadJob.objects.filter(status='queued')
+            .order_by('created_at')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+
+        # Conditional update: only one worker wins the queued -> processing transition.
+        claimed = UploadJob.objects.filter(pk=job_id, status='queued').update(
+            status='processing', updated_at=timezone.now()
+        )
+        if claimed:
+            return UploadJob.objects.get(pk=job_id)
+
+
+def run_pending_jobs(max_jobs=None) -> int:
+    """Process queued jobs until the queue is empty (or max_jobs ran)."""
+    requeue_stale_jobs()
+
+    count = 0
+    while max_jobs is None or count < max_jobs:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+def _job_file_source(job_file: UploadJobFile):
+    try:
+        return job_file.source.path
+    except NotImplementedError:
+        # Remote storage: hand the engine the raw bytes instead of a path.
+        with job_file.source.open('rb') as fh:
+            return BytesIO(fh.read())
+
+
+def _resolve_target(job: UploadJob):
+    if job.kind == 'portfolio':
+        return PortfolioCategory.objects.filter(pk=job.target_id).first()
+    if job.kind == 'service':
+        return Service.objects.filter(pk=job.target_id).first()
+    return None
+
+
+def _submit(job: UploadJob, job_file: UploadJobFile):
+    from .views import _safe_stem
+
+    source = _job_file_source(job_file)
+    stem = _safe_stem(job_file.original_name)
+
+    if job.kind == 'album':
+        return image_engine.submit_image(source, f"{job_file.index}-{stem}")
+
+    millis = int(time.time() * 1000)
+    if job.kind == 'portfolio':
+        return image_engine.submit_full_image(source, f"portfolio-{millis}-{job_file.index}-{stem}")
+    return image_engine.submit_full_image(source, f"service-{job.target_id}-{millis}-{job_file.index}-{stem}")
+
+
+def run_job(job: UploadJob) -> None:
+    """Process every pending file of a claimed job, recording per-file results."""
+    target = _resolve_target(job)
+    if job.kind != 'album' and target is None:
+        UploadJob.objects.filter(pk=job.pk).update(
+            status='failed',
+            error='Upload target no longer exists',
+            updated_at=timezone.now(),
+            finished_at=timezone.now(),
+        )
+        return
+
+    last_order = 0
+    if job.kind == 'portfolio':
+        last_order = PortfolioImage.objects.filter(category=target).aggregate(
+            max_order=models.Max('order')
+        )['max_order'] or 0
+    elif job.kind == 'service':
+        last_order = ServiceGalleryImage.objects.filter(service=target).aggregate(
+            max_order=models.Max('order')
+        )['max_order'] or 0
+
+    job_files = list(job.files.filter(status__in=['queued', 'processing']))
+    UploadJobFile.objects.filter(pk__in=[jf.pk for jf in job_files]).update(status='processing')
+
+    pending = []
+    for job_file in job_files:
+        try:
+            pending.append((job_file, _submit(job, job_file)))
+        except Exception as e:
+            pending.append((job_file, e))
+
+    for job_file, future in pending:
+        try:
+            if isinstance(future, Exception):
+                raise future
+            processed = future.result()
+
+            if job.kind == 'album':
+                job_file.result = write_album_derivatives(job.output_dir, processed)
+            elif job.kind == 'portfolio':
+                obj = PortfolioImage.objects.create(
+                    image=processed,
+                    category=target,
+                    order=last_order + job_file.index + 1,
+                )
+                job_file.result = {'id': obj.id}
+            else:
+                obj = ServiceGalleryImage.objects.create(
+                    service=target,
+                    image=processed,
+                    order=last_order + job_file.index + 1,
+                )
+                job_file.result = {'id': obj.id}
+            job_file.status = 'done'
+            job_file.error = ''
+        except Exception as e:
+            logger.warning("Upload job %s file %s failed: %s", job.pk, job_file.index, e)
+            job_file.status = 'failed'
+            job_file.error = str(e)
+
+        if job_file.source:
+            job_file.source.delete(save=False)
+        job_file.save(update_fields=['status', 'result', 'error', 'source'])
+        # Heartbeat so the job is not considered stale while it makes progress.
+        UploadJob.objects.filter(pk=job.pk).update(updated_at=timezone.now())
+
+    failed = job.files.filter(status='failed').count()
+    total = job.files.count()
+    UploadJob.objects.filter(pk=job.pk).update(
+        status='failed' if total and failed == total else 'completed',
+        error=f'{failed} of {total} files failed' if failed else '',
+        updated_at=timezone.now(),
+        finished_at=timezone.now(),
+    )
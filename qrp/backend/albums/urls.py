@@ -1,8 +1,8 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
-    AlbumCreateView, AlbumDetailView, GuestMessageCreateView,
-    UploadImagesView, DownloadPhotoView, DownloadAlbumZipView,
+    AlbumCreateView, AlbumDetailView, AlbumSummaryView, AlbumPhotosView, GuestMessageCreateView,
+    UploadImagesView, UploadJobDetailView, DownloadPhotoView, DownloadAlbumZipView,
     PhotoLikeView, MyAlbumsView, StudioDataView, BulkUploadPortfolioImagesView,
     BulkUploadServiceImagesView, StudioContentManageView, StudioStatManageView,
     StudioStatDetailManageView, ServiceManageView, ServiceDetailManageView,
@@ -29,15 +29,19 @@ urlpatterns = [
     path('albums/', AlbumCreateView.as_view(), name='album-list-create'),
     path('albums/my/', MyAlbumsView.as_view(), name='my-albums'),
     path('albums/<slug:slug>/', AlbumDetailView.as_view(), name='album-detail'),
+    path('albums/<slug:slug>/summary/', AlbumSummaryView.as_view(), name='album-summary'),
+    path('albums/<slug:slug>/photos/', AlbumPhotosView.as_view(), name='album-photos'),
     path('albums/<slug:slug>/messages/', GuestMessageCreateView.as_view(), name='guest-message-create'),
     path('albums/<slug:slug>/download/<int:photo_index>/', DownloadPhotoView.as_view(), name='download-photo'),
     path('albums/<slug:slug>/download-zip/', DownloadAlbumZipView.as_view(), name='download-album-zip'),
+    path('albums/<slug:slug>/photos/<int:photo_id>/download/', DownloadPhotoView.as_view(), name='download-photo-by-id'),
     path('albums/<slug:slug>/photos/<int:photo_id>/like/', PhotoLikeView.as_view(), name='photo-like'),
     
     # Upload endpoints
     path('uploads/images/', UploadImagesView.as_view(), name='upload-images'),
     path('uploads/portfolio/', BulkUploadPortfolioImagesView.as_view(), name='bulk-upload-portfolio'),
     path('uploads/service/', BulkUploadServiceImagesView.as_view(), name='bulk-upload-service'),
+    path('uploads/jobs/<uuid:job_id>/', UploadJobDetailView.as_view(), name='upload-job-detail'),
     
     # Studio landing page data
     path('studio/', StudioDataView.as_view(), name='studio-data'),
@@ -1,24 +1,24 @@
+import logging
 import os
 import re
 import time
-import zipfile
 from django.conf import settings
-from django.http import HttpResponse, Http404
-from django.core.cache import cache
-from django.views.decorators.cache import cache_page
-from django.utils.decorators import method_decorator
+from django.http import FileResponse, HttpResponse, Http404, StreamingHttpResponse
 from django.utils.html import escape
-from django.db.models import Prefetch, Count, Max
-from django.db import models
+from django.db.models import Prefetch, Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db import models, transaction
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
-from urllib.parse import urlparse
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from wedding_album.file_serving import serve_file
 
 from .models import (
     Album,
@@ -38,9 +38,10 @@ from .models import (
     StudioContactInfo,
     SocialLink,
     ContactMessage,
+    UploadJob,
 )
 from .serializers import (
-    AlbumSerializer, GuestMessageSerializer, AlbumListSerializer,
+    AlbumSerializer, GuestMessageSerializer, AlbumListSerializer, AlbumSummarySerializer,
     StudioContentSerializer, StudioStatSerializer, ServiceSerializer, TestimonialSerializer,
     PortfolioImageSerializer, PortfolioCategorySerializer, ServiceGalleryImageSerializer,
     StudioContentUpdateSerializer, StudioStatCreateUpdateSerializer, ServiceCreateUpdateSerializer,
@@ -50,9 +51,30 @@ from .serializers import (
     StudioContactInfoSerializer, StudioContactInfoUpdateSerializer,
     SocialLinkSerializer, SocialLinkCreateUpdateSerializer,
     ContactMessageSerializer,
+    UploadJobSerializer,
+    photo_payload,
 )
+from .client_ip import get_client_ip
 from .permissions import IsOwnerOrReadOnly, IsAuthenticatedOrReadOnly
+from .archive import (
+    album_archive_entries,
+    album_photo_rows,
+    archive_fingerprint,
+    cached_archive_path,
+    iter_zip,
+    media_path_from_url,
+    schedule_album_archive,
+)
 from .image_processor import ImageProcessor
+from . import image_engine, likes, media_registry, media_storage, outbox, studio_cache
+from .upload_jobs import (
+    album_derivative_urls,
+    enqueue_upload_job,
+    new_album_upload_dir,
+    start_album_derivatives,
+)
+
+logger = logging.getLogger(__name__)
 
 
 def _safe_stem(filename: str) -> str:
@@ -61,11 +83,87 @@ def _safe_stem(filename: str) -> str:
     return (stem or 'image')[:80]
 
 
+def _wants_async_upload(request) -> bool:
+    """Async upload mode is opt-in per request via ?async=1 (or an 'async' form field)."""
+    value = request.query_params.get('async', request.data.get('async', ''))
+    return str(value).strip().lower() in ('1', 'true', 'yes')
+
+
+def _upload_job_accepted(request, job):
+    return Response({
+        'job_id': str(job.id),
+        'status': job.status,
+        'status_url': request.build_absolute_uri(reverse('upload-job-detail', args=[job.id])),
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+class AlbumCursorPagination(CursorPagination):
+    """Keyset pagination on (-created_at, id): every page costs the same.
+
+    The total is only computed when asked for with ?include_count=1.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        include_count = request.query_params.get('include_count', '').lower() in ('1', 'true', 'yes')
+        self.total_count = queryset.count() if include_count else None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link(), 'previous': self.get_previous_link()}
+        if self.total_count is not None:
+            payload['count'] = self.total_count
+        payload['results'] = data
+        return Response(payload)
+
+
 class AlbumPagination(PageNumberPagination):
+    """Page numbers by default; cursor mode with ?cursor= or ?pagination=cursor."""
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+    cursor_pagination_class = AlbumCursorPagination
+    cursor = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if 'cursor' in params or params.get('pagination') == 'cursor':
+            self.cursor = self.cursor_pagination_class()
+            return self.cursor.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor is not None:
+            return self.cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+def _album_list_queryset(queryset):
+    """Annotate photo count and cover photo so list pages never load photos."""
+    album_photos = Photo.objects.filter(album=OuterRef('pk'))
+    first_photo = album_photos.order_by('order', 'id')
+    photo_count = album_photos.order_by().values('album').annotate(total=Count('id')).values('total')
+    return queryset.annotate(
+        photo_count=Coalesce(Subquery(photo_count), 0),
+        cover_url=Subquery(first_photo.values('url')[:1]),
+        cover_thumbnail_url=Subquery(first_photo.values('thumbnail_url')[:1]),
+    )
+
+
+def _with_gallery_images(queryset):
+    """Prefetch each service's ordered gallery in one query (ServiceSerializer)."""
+    return queryset.prefetch_related(
+        Prefetch(
+            'gallery_images',
+            queryset=ServiceGalleryImage.objects.order_by('order', 'created_at'),
+            to_attr='ordered_gallery_images',
+        )
+    )
+
 
 class AlbumCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -77,7 +175,7 @@ class AlbumCreateView(generics.ListCreateAPIView):
         return AlbumSerializer
 
     def get_queryset(self):
-        return Album.objects.select_related('owner').prefetch_related('photos').order_by('-created_at')
+        return _album_list_queryset(Album.objects.select_related('owner').order_by('-created_at'))
     
     def get_serializer_context(self):
         return {'request': self.request}
@@ -103,6 +201,62 @@ class AlbumDetailView(generics.RetrieveUpdateDestroyAPIView):
         serializer.save(owner=serializer.instance.owner)
 
 
+class AlbumPhotoPagination(CursorPagination):
+    """Keyset pages of an album's photos in display order."""
+    page_size = 60
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('order', 'id')
+
+
+class AlbumSummaryView(generics.RetrieveAPIView):
+    """Album header for the landing page: metadata and counts, no photo list."""
+    serializer_class = AlbumSummarySerializer
+    lookup_field = 'slug'
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        message_count = (
+            GuestMessage.objects.filter(album=OuterRef('pk'))
+            .order_by()
+            .values('album')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        return _album_list_queryset(Album.objects.select_related('owner')).annotate(
+            message_count=Coalesce(Subquery(message_count), 0)
+        )
+
+
+class AlbumPhotosView(APIView):
+    """Paged photo list for an album: /api/albums/<slug>/photos/?cursor=..."""
+    permission_classes = [AllowAny]
+    pagination_class = AlbumPhotoPagination
+
+    def get(self, request, slug):
+        album_id = get_object_or_404(Album.objects.values_list('id', flat=True), slug=slug)
+        queryset = Photo.objects.filter(album_id=album_id).only(
+            'id', 'url', 'thumbnail_url', 'medium_url', 'order', 'likes_count', 'width', 'height'
+        )
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+
+        # Like state only for the photos on this page.
+        ip_address = get_client_ip(request)
+        liked_photo_ids = set()
+        if ip_address and page:
+            liked_photo_ids = set(
+                PhotoLike.objects.filter(
+                    photo_id__in=[p.id for p in page], ip_address=ip_address
+                ).values_list('photo_id', flat=True)
+            )
+
+        return paginator.get_paginated_response(
+            [photo_payload(p, request, liked_photo_ids) for p in page]
+        )
+
+
 class MyAlbumsView(generics.ListAPIView):
     """List all albums owned by the current user"""
     serializer_class = AlbumListSerializer
@@ -110,7 +264,9 @@ class MyAlbumsView(generics.ListAPIView):
     pagination_class = AlbumPagination
     
     def get_queryset(self):
-        return Album.objects.filter(owner=self.request.user).select_related('owner').prefetch_related('photos').order_by('-created_at')
+        return _album_list_queryset(
+            Album.objects.filter(owner=self.request.user).select_related('owner').order_by('-created_at')
+        )
     
     def get_serializer_context(self):
         return {'request': self.request}
@@ -129,55 +285,59 @@ class UploadImagesView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        
         files = request.FILES.getlist('files')
         if not files:
             return Response({'detail': 'No files provided'}, status=status.HTTP_400_BAD_REQUEST)
 
-        ts = str(int(time.time() * 1000))
-        subdir = os.path.join('albums', ts)
-        target_dir = os.path.join(settings.MEDIA_ROOT, subdir)
-        os.makedirs(target_dir, exist_ok=True)
+        if _wants_async_upload(request):
+            job = enqueue_upload_job(request.user, 'album', files)
+            return _upload_job_accepted(request, job)
 
-        def process_single_image(idx, f):
-            safe_name = f"{idx}-{_safe_stem(f.name)}"
-            processed = ImageProcessor.process_image(f, safe_name)
-            
-            thumb_path = os.path.join(target_dir, processed['thumbnail'].name)
-            medium_path = os.path.join(target_dir, processed['medium'].name)
-            full_path = os.path.join(target_dir, processed['full'].name)
-            
-            with open(thumb_path, 'wb') as dest:
-                dest.write(processed['thumbnail'].read())
-            with open(medium_path, 'wb') as dest:
-                dest.write(processed['medium'].read())
-            with open(full_path, 'wb') as dest:
-                dest.write(processed['full'].read())
-            
-            base_url = settings.MEDIA_URL + subdir.replace('\\', '/') + '/'
-            return {
-                'url': request.build_absolute_uri(base_url + processed['full'].name),
-                'thumbnail_url': request.build_absolute_uri(base_url + processed['thumbnail'].name),
-                'medium_url': request.build_absolute_uri(base_url + processed['medium'].name),
-            }
+        subdir = new_album_upload_dir()
+
+        # Decode/resize/encode runs in the shared image engine; this thread
+        # only submits jobs (blocking while the engine is saturated) and
+        # hands the finished derivatives to storage, which writes them
+        # concurrently.
+        futures = [
+            image_engine.submit_image(f, f"{idx}-{_safe_stem(f.name)}")
+            for idx, f in enumerate(files)
+        ]
+
+        writes = []
+        for future in futures:
+            try:
+                processed = future.result()
+            except Exception as e:
+                return Response({'detail': f'Failed to process image: {str(e)}'}, 
+                              status=status.HTTP_400_BAD_REQUEST)
+
+            writes.append(start_album_derivatives(subdir, processed))
 
         results = []
-        with ThreadPoolExecutor(max_workers=6) as executor:
-            futures = {executor.submit(process_single_image, idx, f): idx for idx, f in enumerate(files)}
-            for future in as_completed(futures):
-                try:
-                    results.append(future.result())
-                except Exception as e:
-                    return Response({'detail': f'Failed to process image: {str(e)}'}, 
-                                  status=status.HTTP_400_BAD_REQUEST)
+        for pending in writes:
+            urls = album_derivative_urls(pending)
+            results.append({key: request.build_absolute_uri(value) for key, value in urls.items()})
 
         return Response({'images': results}, status=status.HTTP_201_CREATED)
 
 
+class UploadJobDetailView(APIView):
+    """Progress and results of an asynchronous upload job"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_object_or_404(
+            UploadJob.objects.prefetch_related('files'),
+            pk=job_id,
+            owner=request.user,
+        )
+        return Response(UploadJobSerializer(job, context={'request': request}).data)
+
+
 class DownloadPhotoView(APIView):
-    def get(self, request, slug, photo_index):
-        album = get_object_or_404(Album, slug=slug)
+    def get(self, request, slug, photo_index=None, photo_id=None):
+        album = get_object_or_404(Album.objects.only('id', 'allow_downloads'), slug=slug)
         
         # Check if downloads are allowed for this album
         if not album.allow_downloads:
@@ -186,27 +346,39 @@ class DownloadPhotoView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        photos = list(album.photos.all())
-        if photo_index >= len(photos):
+        # A single row from the (album, order) index; no photo instances are built.
+        photos = Photo.objects.filter(album_id=album.id)
+        if photo_id is not None:
+            urls = photos.filter(id=photo_id).values_list('url', flat=True)[:1]
+        else:
+            urls = photos.order_by('order', 'id').values_list('url', flat=True)[photo_index:photo_index + 1]
+        photo_url = next(iter(urls), None)
+        if photo_url is None:
             raise Http404("Photo not found")
-        
-        photo = photos[photo_index]
-        parsed_url = urlparse(photo.url)
-        # Remove both /media/ and leading slash
-        relative_path = parsed_url.path.lstrip('/')
-        if relative_path.startswith('media/'):
-            relative_path = relative_path[6:]  # Remove 'media/'
-        
-        file_path = os.path.join(settings.MEDIA_ROOT, relative_path)
-        
-        if not os.path.exists(file_path):
+
+        if not media_storage.is_local():
+            # Remote storage (S3 etc.): stream the object through the app.
+            name = media_registry.path_from_url(photo_url)
+            if name is None:
+                raise Http404("File not found")
+            try:
+                handle = default_storage.open(name, 'rb')
+            except OSError:
+                raise Http404("File not found")
+            return FileResponse(
+                handle,
+                as_attachment=True,
+                filename=os.path.basename(name),
+                content_type='application/octet-stream',
+            )
+
+        file_path = media_path_from_url(photo_url)
+        if file_path is None:
             raise Http404("File not found")
-        
-        with open(file_path, 'rb') as f:
-            response = HttpResponse(f.read(), content_type='application/octet-stream')
-            filename = os.path.basename(file_path)
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            return response
+
+        return serve_file(
+            request, file_path, content_type='application/octet-stream', as_attachment=True
+        )
 
 
 class DownloadAlbumZipView(APIView):
@@ -220,74 +392,101 @@ class DownloadAlbumZipView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        response = HttpResponse(content_type='application/zip')
-        response['Content-Disposition'] = f'attachment; filename="{album.names}_photos.zip"'
-        
-        with zipfile.ZipFile(response, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for photo in album.photos.all():
-                parsed_url = urlparse(photo.url)
-                # Remove both /media/ and leading slash
-                relative_path = parsed_url.path.lstrip('/')
-                if relative_path.startswith('media/'):
-                    relative_path = relative_path[6:]  # Remove 'media/'
-                
-                file_path = os.path.join(settings.MEDIA_ROOT, relative_path)
-                
-                if os.path.exists(file_path):
-                    filename = os.path.basename(file_path)
-                    zip_file.write(file_path, filename)
-        
+        # Resolve the photo list up front so no DB access happens while streaming.
+        photo_rows = album_photo_rows(album.id)
+        filename = f"{album.names}_photos.zip"
+
+        if not media_storage.is_local():
+            # Photos live in remote storage: read them through it, uncached.
+            entries = album_archive_entries((url for _, url in photo_rows), from_storage=True)
+            return self._stream(iter_zip(entries, from_storage=True), filename)
+
+        cached_path = cached_archive_path(album.id, archive_fingerprint(photo_rows))
+        if os.path.isfile(cached_path):
+            try:
+                # Sent with Content-Length, so clients get progress and resume.
+                return serve_file(
+                    request,
+                    cached_path, content_type='application/zip', as_attachment=True, filename=filename
+                )
+            except Http404:
+                pass  # Replaced by a rebuild in the meantime; stream instead.
+
+        # Not built yet (or stale): stream this one and build the cache for next time.
+        schedule_album_archive(album.id, postpone=False)
+        return self._stream(iter_zip(album_archive_entries(url for _, url in photo_rows)), filename)
+
+    def _stream(self, chunks, filename):
+        response = StreamingHttpResponse(chunks, content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
 
 
 class PhotoLikeView(APIView):
     def post(self, request, slug, photo_id):
-        from django.db import transaction
+        from django.db import IntegrityError, transaction
         
-        album = get_object_or_404(Album, slug=slug)
-        photo = get_object_or_404(Photo, id=photo_id, album=album)
+        photo = Photo.objects.filter(id=photo_id)
+        stored_count = photo.filter(album__slug=slug).values_list('likes_count', flat=True).first()
+        if stored_count is None:
+            raise Http404("Photo not found")
+        
+        ip_address = get_client_ip(request)
         
-        ip_address = self.get_client_ip(request)
+        if likes.batching_enabled():
+            # Buffered and written in batches; the count is optimistic.
+            liked, likes_count = likes.toggle_like(photo_id, ip_address, stored_count)
+            return Response({'liked': liked, 'likes_count': likes_count})
         
+        # Photo.likes_count is kept in step with PhotoLike rows using atomic
+        # F() updates, so reads never need to count likes.
         with transaction.atomic():
-            like, created = PhotoLike.objects.get_or_create(
-                photo=photo,
-                ip_address=ip_address
-            )
-            
-            if created:
-                # Get actual count from database
-                likes_count = photo.likes.count()
-                return Response({'liked': True, 'likes_count': likes_count})
+            deleted, _ = PhotoLike.objects.filter(photo_id=photo_id, ip_address=ip_address).delete()
+            if deleted:
+                photo.filter(likes_count__gt=0).update(likes_count=F('likes_count') - 1)
+                liked = False
             else:
-                like.delete()
-                # Get actual count from database after deletion
-                likes_count = photo.likes.count()
-                return Response({'liked': False, 'likes_count': likes_count})
-    
-    def get_client_ip(self, request):
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+                try:
+                    with transaction.atomic():
+                        PhotoLike.objects.create(photo_id=photo_id, ip_address=ip_address)
+                except IntegrityError:
+                    # A concurrent request from the same client already liked it.
+                    pass
+                else:
+                    photo.update(likes_count=F('likes_count') + 1)
+                liked = True
+            likes_count = photo.values_list('likes_count', flat=True).first()
+        
+        return Response({'liked': liked, 'likes_count': likes_count})
 
 
-@method_decorator(cache_page(60), name='get')  # Cache for 1 minute
 class StudioDataView(APIView):
     """Public API for studio landing page data"""
     permission_classes = [AllowAny]
     
     def get(self, request):
+        # Versioned snapshot, invalidated by model signals (albums/studio_cache.py).
+        cache_key = studio_cache.studio_payload_key(request)
+        payload = studio_cache.get_cached_payload(cache_key)
+        if payload is None:
+            payload = self._build_payload(request)
+            if payload is None:
+                return Response(
+                    {'error': 'Failed to fetch studio data'}, 
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+            studio_cache.set_cached_payload(cache_key, payload)
+        return Response(payload)
+
+    def _build_payload(self, request):
         try:
             # Get active studio content
             content = StudioContent.objects.filter(is_active=True).first()
             
             # Get active services, testimonials, and portfolio images
-            services = Service.objects.filter(is_active=True).order_by('order', 'created_at')
+            services = _with_gallery_images(Service.objects.filter(is_active=True).order_by('order', 'created_at'))
             testimonials = Testimonial.objects.filter(is_active=True).order_by('order', 'created_at')
-            portfolio = PortfolioImage.objects.filter(is_active=True).order_by('order', 'created_at')
+            portfolio = PortfolioImage.objects.filter(is_active=True).select_related('category').order_by('order', 'created_at')
 
             # Get portfolio categories for filtering
             categories = PortfolioCategory.objects.filter(is_active=True).order_by('order', 'name')
@@ -296,7 +495,7 @@ class StudioDataView(APIView):
             media_items = MediaItem.objects.filter(is_active=True).order_by('order', 'created_at')
 
             # Get active videos for video portfolio
-            videos = Video.objects.filter(is_active=True).order_by('order', 'created_at')
+            videos = Video.objects.filter(is_active=True).select_related('category').order_by('order', 'created_at')
 
             # Get video categories
             video_categories = VideoCategory.objects.filter(is_active=True).order_by('order', 'name')
@@ -308,7 +507,7 @@ class StudioDataView(APIView):
                 is_active=True
             ).order_by('order', 'platform') if contact_info else SocialLink.objects.none()
 
-            return Response({
+            return {
                 'content': StudioContentSerializer(content).data if content else None,
                 'services': ServiceSerializer(services, many=True, context={'request': request}).data,
                 'testimonials': TestimonialSerializer(testimonials, many=True, context={'request': request}).data,
@@ -319,12 +518,9 @@ class StudioDataView(APIView):
                 'video_categories': VideoCategorySerializer(video_categories, many=True).data,
                 'contact_info': StudioContactInfoSerializer(contact_info).data if contact_info else None,
                 'social_links': SocialLinkSerializer(social_links, many=True).data,
-            })
-        except Exception as e:
-            return Response(
-                {'error': 'Failed to fetch studio data'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+            }
+        except Exception:
+            return None
 
 
 class BulkUploadPortfolioImagesView(APIView):
@@ -345,16 +541,27 @@ class BulkUploadPortfolioImagesView(APIView):
             category = PortfolioCategory.objects.get(id=category_id)
         except PortfolioCategory.DoesNotExist:
             return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if _wants_async_upload(request):
+            job = enqueue_upload_job(request.user, 'portfolio', images, target_id=category.id)
+            return _upload_job_accepted(request, job)
         
         # Get the highest order number for this category
         last_order = PortfolioImage.objects.filter(category=category).aggregate(
             max_order=models.Max('order')
         )['max_order'] or 0
         
+        futures = [
+            image_engine.submit_full_image(
+                image,
+                f"portfolio-{int(time.time() * 1000)}-{idx}-{_safe_stem(getattr(image, 'name', 'image'))}",
+            )
+            for idx, image in enumerate(images)
+        ]
+
         created_images = []
-        for idx, image in enumerate(images):
-            safe_name = f"portfolio-{int(time.time() * 1000)}-{idx}-{_safe_stem(getattr(image, 'name', 'image'))}"
-            optimized = ImageProcessor.process_full_image(image, safe_name)
+        for idx, future in enumerate(futures):
+            optimized = future.result()
             portfolio_image = PortfolioImage.objects.create(
                 image=optimized,
                 category=category,
@@ -363,7 +570,6 @@ class BulkUploadPortfolioImagesView(APIView):
             created_images.append(portfolio_image)
         
         serializer = PortfolioImageSerializer(created_images, many=True, context={'request': request})
-        cache.delete('studio_data')
         return Response({
             'message': f'Successfully uploaded {len(created_images)} images',
             'images': serializer.data
@@ -388,16 +594,27 @@ class BulkUploadServiceImagesView(APIView):
             service = Service.objects.get(id=service_id)
         except Service.DoesNotExist:
             return Response({'error': 'Service not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if _wants_async_upload(request):
+            job = enqueue_upload_job(request.user, 'service', images, target_id=service.id)
+            return _upload_job_accepted(request, job)
         
         # Get the highest order number for this service
         last_order = ServiceGalleryImage.objects.filter(service=service).aggregate(
             max_order=models.Max('order')
         )['max_order'] or 0
         
+        futures = [
+            image_engine.submit_full_image(
+                image,
+                f"service-{service.id}-{int(time.time() * 1000)}-{idx}-{_safe_stem(getattr(image, 'name', 'image'))}",
+            )
+            for idx, image in enumerate(images)
+        ]
+
         created_images = []
-        for idx, image in enumerate(images):
-            safe_name = f"service-{service.id}-{int(time.time() * 1000)}-{idx}-{_safe_stem(getattr(image, 'name', 'image'))}"
-            optimized = ImageProcessor.process_full_image(image, safe_name)
+        for idx, future in enumerate(futures):
+            optimized = future.result()
             gallery_image = ServiceGalleryImage.objects.create(
                 service=service,
                 image=optimized,
@@ -406,7 +623,6 @@ class BulkUploadServiceImagesView(APIView):
             created_images.append(gallery_image)
         
         serializer = ServiceGalleryImageSerializer(created_images, many=True, context={'request': request})
-        cache.delete('studio_data')
         return Response({
             'message': f'Successfully uploaded {len(created_images)} images',
             'images': serializer.data
@@ -429,11 +645,12 @@ class StudioContentManageView(generics.RetrieveUpdateAPIView):
                 StudioStat(content=obj, label='Awards Won', value='0', icon='FiAward', order=3),
                 StudioStat(content=obj, label='Moments Captured', value='0', icon='FiHeart', order=4),
             ])
+            # bulk_create sends no post_save signals.
+            transaction.on_commit(studio_cache.bump_studio_version)
         return obj
     
     def perform_update(self, serializer):
         serializer.save()
-        cache.delete('studio_data')  # Clear cache on update
 
 
 class StudioContactManageView(generics.RetrieveUpdateAPIView):
@@ -451,7 +668,6 @@ class StudioContactManageView(generics.RetrieveUpdateAPIView):
 
     def perform_update(self, serializer):
         serializer.save(is_active=True)
-        cache.delete('studio_data')
 
 
 class SocialLinkManageView(generics.ListCreateAPIView):
@@ -473,7 +689,6 @@ class SocialLinkManageView(generics.ListCreateAPIView):
 
     def perform_create(self, serializer):
         serializer.save(contact_info=self._get_contact())
-        cache.delete('studio_data')
 
 
 class SocialLinkDetailManageView(generics.RetrieveUpdateDestroyAPIView):
@@ -494,11 +709,9 @@ class SocialLinkDetailManageView(generics.RetrieveUpdateDestroyAPIView):
 
     def perform_update(self, serializer):
         serializer.save()
-        cache.delete('studio_data')
 
     def perform_destroy(self, instance):
         instance.delete()
-        cache.delete('studio_data')
 
 
 class StudioStatManageView(generics.ListCreateAPIView):
@@ -519,7 +732,6 @@ class StudioStatManageView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         content, _ = StudioContent.objects.get_or_create(defaults={'is_active': True})
         serializer.save(content=content)
-        cache.delete('studio_data')
 
 
 class StudioStatDetailManageView(generics.RetrieveUpdateDestroyAPIView):
@@ -536,12 +748,9 @@ class StudioStatDetailManageView(generics.RetrieveUpdateDestroyAPIView):
     
     def perform_update(self, serializer):
         serializer.save()
-        cache.delete('studio_data')
     
     def perform_destroy(self, instance):
         instance.delete()
-        cache.delete('studio_data')
-        cache.clear()
 
 
 class ServiceManageView(generics.ListCreateAPIView):
@@ -554,14 +763,13 @@ class ServiceManageView(generics.ListCreateAPIView):
         return ServiceSerializer
     
     def get_queryset(self):
-        return Service.objects.all().order_by('order', 'created_at')
+        return _with_gallery_images(Service.objects.all().order_by('order', 'created_at'))
     
     def get_serializer_context(self):
         return {'request': self.request}
 
     def perform_create(self, serializer):
         serializer.save()
-        cache.delete('studio_data')
 
 
 class ServiceDetailManageView(generics.RetrieveUpdateDestroyAPIView):
@@ -574,18 +782,16 @@ class ServiceDetailManageView(generics.RetrieveUpdateDestroyAPIView):
         return ServiceSerializer
     
     def get_queryset(self):
-        return Service.objects.all()
+        return _with_gallery_images(Service.objects.all())
     
     def get_serializer_context(self):
         return {'request': self.request}
     
     def perform_update(self, serializer):
         serializer.save()
-        cache.delete('studio_data')
     
     def perform_destroy(self, instance):
         instance.delete()
-        cache.delete('studio_data')
 
 
 class TestimonialManageView(generics.ListCreateAPIView):
@@ -608,13 +814,12 @@ class TestimonialManageView(generics.ListCreateAPIView):
         if avatar:
             try:
                 safe_name = f"testimonial-{int(time.time() * 1000)}-{_safe_stem(getattr(avatar, 'name', 'avatar'))}"
-                optimized = ImageProcessor.process_full_image(avatar, safe_name, quality=ImageProcessor.WEBP_QUALITY, suffix='avatar')
+                optimized = image_engine.process_full_image(avatar, safe_name, quality=ImageProcessor.WEBP_QUALITY, suffix='avatar')
                 serializer.save(avatar=optimized)
             except Exception as e:
                 raise ValidationError({'avatar': f'Failed to process avatar: {str(e)}'})
         else:
             serializer.save()
-        cache.delete('studio_data')
 
 
 class TestimonialDetailManageView(generics.RetrieveUpdateDestroyAPIView):
@@ -637,17 +842,15 @@ class TestimonialDetailManageView(generics.RetrieveUpdateDestroyAPIView):
         if avatar:
             try:
                 safe_name = f"testimonial-{serializer.instance.id}-{int(time.time() * 1000)}-{_safe_stem(getattr(avatar, 'name', 'avatar'))}"
-                optimized = ImageProcessor.process_full_image(avatar, safe_name, quality=ImageProcessor.WEBP_QUALITY, suffix='avatar')
+                optimized = image_engine.process_full_image(avatar, safe_name, quality=ImageProcessor.WEBP_QUALITY, suffix='avatar')
                 serializer.save(avatar=optimized)
             except Exception as e:
                 raise ValidationError({'avatar': f'Failed to process avatar: {str(e)}'})
         else:
             serializer.save()
-        cache.delete('studio_data')
     
     def perform_destroy(self, instance):
         instance.delete()
-        cache.delete('studio_data')
 
 
 class PortfolioCategoryManageView(generics.ListCreateAPIView):
@@ -664,7 +867,6 @@ class PortfolioCategoryManageView(generics.ListCreateAPIView):
 
     def perform_create(self, serializer):
         serializer.save()
-        cache.delete('studio_data')
 
 
 class PortfolioCategoryDetailManageView(generics.RetrieveUpdateDestroyAPIView):
@@ -681,11 +883,9 @@ class PortfolioCategoryDetailManageView(generics.RetrieveUpdateDestroyAPIView):
     
     def perform_update(self, serializer):
         serializer.save()
-        cache.delete('studio_data')
     
     def perform_destroy(self, instance):
         instance.delete()
-        cache.delete('studio_data')
 
 
 class PortfolioImageManageView(generics.ListAPIView):
@@ -695,7 +895,7 @@ class PortfolioImageManageView(generics.ListAPIView):
     
     def get_queryset(self):
         category_id = self.request.query_params.get('category_id')
-        queryset = PortfolioImage.objects.all()
+        queryset = PortfolioImage.objects.select_related('category')
         if category_id:
             queryset = queryset.filter(category_id=category_id)
         return queryset.order_by('order', 'created_at')
@@ -710,24 +910,22 @@ class PortfolioImageDetailManageView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = PortfolioImageSerializer
 
     def get_queryset(self):
-        return PortfolioImage.objects.all()
+        return PortfolioImage.objects.select_related('category')
 
     def perform_update(self, serializer):
         image = serializer.validated_data.get('image')
         if image:
             try:
                 safe_name = f"portfolio-{serializer.instance.id}-{int(time.time() * 1000)}-{_safe_stem(getattr(image, 'name', 'image'))}"
-                optimized = ImageProcessor.process_full_image(image, safe_name)
+                optimized = image_engine.process_full_image(image, safe_name)
                 serializer.save(image=optimized)
             except Exception as e:
                 raise ValidationError({'image': f'Failed to process image: {str(e)}'})
         else:
             serializer.save()
-        cache.delete('studio_data')
 
     def perform_destroy(self, instance):
         instance.delete()
-        cache.delete('studio_data')
 
 
 class ServiceGalleryImageManageView(generics.ListAPIView):
@@ -757,17 +955,15 @@ class ServiceGalleryImageDetailManageView(generics.RetrieveUpdateDestroyAPIView)
         if image:
             try:
                 safe_name = f"service-gallery-{serializer.instance.id}-{int(time.time() * 1000)}-{_safe_stem(getattr(image, 'name', 'image'))}"
-                optimized = ImageProcessor.process_full_image(image, safe_name)
+                optimized = image_engine.process_full_image(image, safe_name)
                 serializer.save(image=optimized)
             except Exception as e:
                 raise ValidationError({'image': f'Failed to process image: {str(e)}'})
         else:
             serializer.save()
-        cache.delete('studio_data')
 
     def perform_destroy(self, instance):
         instance.delete()
-        cache.delete('studio_data')
 
 
 # Video Management Views
@@ -808,7 +1004,7 @@ class VideoManageView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         category_id = self.request.query_params.get('category_id')
-        queryset = Video.objects.all()
+        queryset = Video.objects.select_related('category')
         if category_id:
             queryset = queryset.filter(category_id=category_id)
         return queryset.order_by('order', 'created_at')
@@ -821,7 +1017,7 @@ class VideoManageView(generics.ListCreateAPIView):
         if thumbnail:
             try:
                 safe_name = f"video-thumb-{int(time.time() * 1000)}-{_safe_stem(getattr(thumbnail, 'name', 'thumbnail'))}"
-                optimized = ImageProcessor.process_full_image(
+                optimized = image_engine.process_full_image(
                     thumbnail,
                     safe_name,
                     max_size=ImageProcessor.MEDIUM_SIZE,
@@ -833,7 +1029,6 @@ class VideoManageView(generics.ListCreateAPIView):
                 raise ValidationError({'thumbnail': f'Failed to process thumbnail: {str(e)}'})
         else:
             serializer.save()
-        cache.delete('studio_data')
 
 
 class VideoDetailManageView(generics.RetrieveUpdateDestroyAPIView):
@@ -846,7 +1041,7 @@ class VideoDetailManageView(generics.RetrieveUpdateDestroyAPIView):
         return VideoSerializer
 
     def get_queryset(self):
-        return Video.objects.all()
+        return Video.objects.select_related('category')
 
     def get_serializer_context(self):
         return {'request': self.request}
@@ -856,7 +1051,7 @@ class VideoDetailManageView(generics.RetrieveUpdateDestroyAPIView):
         if thumbnail:
             try:
                 safe_name = f"video-thumb-{serializer.instance.id}-{int(time.time() * 1000)}-{_safe_stem(getattr(thumbnail, 'name', 'thumbnail'))}"
-                optimized = ImageProcessor.process_full_image(
+                optimized = image_engine.process_full_image(
                     thumbnail,
                     safe_name,
                     max_size=ImageProcessor.MEDIUM_SIZE,
@@ -868,11 +1063,9 @@ class VideoDetailManageView(generics.RetrieveUpdateDestroyAPIView):
                 raise ValidationError({'thumbnail': f'Failed to process thumbnail: {str(e)}'})
         else:
             serializer.save()
-        cache.delete('studio_data')
 
     def perform_destroy(self, instance):
         instance.delete()
-        cache.delete('studio_data')
 
 
 class BulkUploadVideosView(APIView):
@@ -908,7 +1101,7 @@ class BulkUploadVideosView(APIView):
             if thumbnail_file:
                 try:
                     safe_name = f"video-thumb-{category.id}-{int(time.time() * 1000)}-{idx}-{_safe_stem(getattr(thumbnail_file, 'name', 'thumbnail'))}"
-                    optimized_thumb = ImageProcessor.process_full_image(
+                    optimized_thumb = image_engine.process_full_image(
                         thumbnail_file,
                         safe_name,
                         max_size=ImageProcessor.MEDIUM_SIZE,
@@ -928,7 +1121,6 @@ class BulkUploadVideosView(APIView):
             created_videos.append(video)
 
         serializer = VideoSerializer(created_videos, many=True, context={'request': request})
-        cache.delete('studio_data')
         return Response({
             'message': f'Successfully uploaded {len(created_videos)} videos',
             'videos': serializer.data
@@ -960,13 +1152,12 @@ class MediaItemManageView(generics.ListCreateAPIView):
         if file_obj and media_type == 'image':
             try:
                 safe_name = f"hero-media-{int(time.time() * 1000)}-{_safe_stem(getattr(file_obj, 'name', 'media'))}"
-                optimized = ImageProcessor.process_full_image(file_obj, safe_name)
+                optimized = image_engine.process_full_image(file_obj, safe_name)
                 serializer.save(file=optimized, **save_kwargs)
             except Exception as e:
                 raise ValidationError({'file': f'Failed to process image: {str(e)}'})
         else:
             serializer.save(**save_kwargs)
-        cache.delete('studio_data')
 
 
 class MediaItemDetailManageView(generics.RetrieveUpdateDestroyAPIView):
@@ -990,40 +1181,30 @@ class MediaItemDetailManageView(generics.RetrieveUpdateDestroyAPIView):
         if file_obj and effective_media_type == 'image':
             try:
                 safe_name = f"hero-media-{serializer.instance.id}-{int(time.time() * 1000)}-{_safe_stem(getattr(file_obj, 'name', 'media'))}"
-                optimized = ImageProcessor.process_full_image(file_obj, safe_name)
+                optimized = image_engine.process_full_image(file_obj, safe_name)
                 serializer.save(file=optimized)
             except Exception as e:
                 raise ValidationError({'file': f'Failed to process image: {str(e)}'})
         else:
             serializer.save()
-        cache.delete('studio_data')
     
     def perform_destroy(self, instance):
         instance.delete()
-        cache.delete('studio_data')
 
 
 class ContactMessageCreateView(generics.CreateAPIView):
-    """Create contact message and send email notification"""
+    """Create contact message and queue email notifications"""
     serializer_class = ContactMessageSerializer
     permission_classes = [AllowAny]
     throttle_classes = [ScopedRateThrottle]
     throttle_scope = 'contact_form'
     
-    def get_client_ip(self, request):
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
-    
     def perform_create(self, serializer):
-        # Save the message with IP address
-        message = serializer.save(ip_address=self.get_client_ip(self.request))
-        
-        # Send email notification
-        self.send_email_notification(message)
+        # Save the message and queue its emails together; the outbox worker
+        # sends them after commit, so the response doesn't wait on SMTP.
+        with transaction.atomic():
+            message = serializer.save(ip_address=get_client_ip(self.request))
+            self.send_email_notification(message)
     
     def _resolve_service_label(self, raw_value):
         """Map a submitted service identifier to a human-friendly label."""
@@ -1039,11 +1220,8 @@ class ContactMessageCreateView(generics.CreateAPIView):
         return value
 
     def send_email_notification(self, message):
-        """Send email notification to studio and confirmation to user"""
+        """Queue email notification to studio and confirmation to user"""
         try:
-            from django.core.mail import send_mail
-            from django.conf import settings
-            
             # Get studio contact info for recipient email
             contact_info = StudioContactInfo.objects.filter(is_active=True).first()
             recipient_email = contact_info.email if contact_info and contact_info.email else settings.DEFAULT_FROM_EMAIL
@@ -1094,13 +1272,11 @@ class ContactMessageCreateView(generics.CreateAPIView):
                 "You can view and manage this message in the admin panel."
             )
 
-            send_mail(
+            outbox.enqueue(
                 f'New Contact Message from {message.full_name}',
                 studio_message,
-                settings.DEFAULT_FROM_EMAIL,
                 [recipient_email],
-                fail_silently=True,
-                html_message=studio_html,
+                html_body=studio_html,
             )
 
             # Confirmation email to user
@@ -1138,18 +1314,16 @@ class ContactMessageCreateView(generics.CreateAPIView):
                 "Note: This is an automated message. Please do not reply to this email."
             )
 
-            send_mail(
+            outbox.enqueue(
                 user_subject,
                 user_message,
-                settings.DEFAULT_FROM_EMAIL,
                 [message.email],
-                fail_silently=True,
-                html_message=user_html,
+                html_body=user_html,
             )
             
-        except Exception as e:
-            # Log the error but don't fail the request
-            print(f"Email sending failed: {str(e)}")
+        except Exception:
+            # Don't fail the request, but the emails are lost: log loudly.
+            logger.exception("Queueing contact emails for message %s failed", message.pk)
 
 
 class ContactMessageManageView(generics.ListAPIView):
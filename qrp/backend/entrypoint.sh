@@ -11,16 +11,21 @@ mkdir -p "$(dirname "${DJANGO_DB_PATH:-/data/db.sqlite3}")"
 echo "Running migrations..."
 python manage.py migrate --noinput
 
+echo "Populating media registry..."
+python manage.py rebuild_media_registry --if-empty
+
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
 # Bind to all interfaces inside container
 GUNICORN_BIND=${GUNICORN_BIND:-0.0.0.0:8000}
 GUNICORN_WORKERS=${GUNICORN_WORKERS:-3}
+GUNICORN_THREADS=${GUNICORN_THREADS:-2}
 GUNICORN_TIMEOUT=${GUNICORN_TIMEOUT:-120}
 
 echo "Starting gunicorn on ${GUNICORN_BIND}"
 exec gunicorn wedding_album.wsgi:application \
   --bind "${GUNICORN_BIND}" \
   --workers "${GUNICORN_WORKERS}" \
+  --threads "${GUNICORN_THREADS}" \
   --timeout "${GUNICORN_TIMEOUT}"
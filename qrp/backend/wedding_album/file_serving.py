@@ -0,0 +1,248 @@
+"""Helpers for sending files from disk without buffering them in Python.
+
+MEDIA_SERVE_MODE selects how the bytes are delivered:
+
+* ``stream``     - FileResponse; the WSGI server's file wrapper (os.sendfile
+                   under gunicorn) copies the file to the socket.
+* ``x-accel``    - an empty response with ``X-Accel-Redirect`` so nginx serves
+                   the file from its internal MEDIA_ACCEL_REDIRECT_PREFIX location.
+* ``x-sendfile`` - an empty response with ``X-Sendfile`` (Apache, lighttpd).
+
+Django still does the path and permission checks in every mode. Responses
+carry a strong ETag and Last-Modified, conditional requests are answered
+with 304/412, and in ``stream`` mode byte ranges are served as 206 (single
+range) or multipart/byteranges (several ranges). In the proxy modes the
+front-end server handles ranges itself.
+"""
+import mimetypes
+import os
+import re
+import uuid
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+SERVE_STREAM = 'stream'
+SERVE_X_ACCEL = 'x-accel'
+SERVE_X_SENDFILE = 'x-sendfile'
+
+CHUNK_SIZE = 64 * 1024
+# Refuse pathological Range headers (many tiny or overlapping ranges).
+MAX_RANGES = 16
+
+_RANGE_SPEC = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+
+
+def safe_join(root, path: str) -> str | None:
+    """Resolve ``path`` under ``root``; None if it escapes the root."""
+    root = os.path.realpath(root)
+    candidate = os.path.realpath(os.path.join(root, path.lstrip('/\\')))
+    if candidate != root and not candidate.startswith(root + os.sep):
+        return None
+    return candidate
+
+
+def guess_content_type(file_path: str) -> str:
+    content_type, _ = mimetypes.guess_type(file_path)
+    return content_type or 'application/octet-stream'
+
+
+def _accel_location(file_path: str) -> str | None:
+    """Internal nginx URI for a file under MEDIA_ROOT."""
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    if not file_path.startswith(media_root + os.sep):
+        return None
+    relative = os.path.relpath(file_path, media_root).replace(os.sep, '/')
+    prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+    return prefix.rstrip('/') + '/' + quote(relative)
+
+
+def file_etag(stat_result) -> str:
+    """Strong validator: changes whenever the file's size or mtime does."""
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def parse_range_header(header: str, size: int):
+    """Parse a ``Range: bytes=...`` header into inclusive (start, end) pairs.
+
+    Returns None when the header should be ignored (malformed, other unit,
+    too many ranges) and an empty list when no range is satisfiable.
+    """
+    unit, _, specs = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not specs:
+        return None
+
+    ranges = []
+    for spec in specs.split(','):
+        match = _RANGE_SPEC.match(spec)
+        if not match or match.group(1) == match.group(2) == '':
+            return None
+        first, last = match.groups()
+        if first == '':
+            # Suffix range: the last N bytes.
+            length = int(last)
+            if length == 0:
+                continue
+            start, end = max(0, size - length), size - 1
+        else:
+            start = int(first)
+            if last and int(last) < start:
+                return None
+            if start >= size:
+                continue
+            end = min(int(last), size - 1) if last else size - 1
+        ranges.append((start, end))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+    return ranges
+
+
+def _if_range_matches(request, etag: str, mtime: float) -> bool:
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith(('"', 'W/')):
+        # Only a strong, exact match allows a partial response.
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def _iter_file_range(handle, start: int, length: int):
+    handle.seek(start)
+    remaining = length
+    while remaining > 0:
+        chunk = handle.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _single_range_response(handle, content_type, size, start, end):
+    def body():
+        # Django closes the generator when the response is closed.
+        with handle:
+            yield from _iter_file_range(handle, start, end - start + 1)
+
+    response = StreamingHttpResponse(body(), status=206, content_type=content_type)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(end - start + 1)
+    return response
+
+
+def _multi_range_response(handle, content_type, size, ranges):
+    boundary = uuid.uuid4().hex
+    parts = []
+    total = 0
+    for start, end in ranges:
+        header = (
+            f'--{boundary}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n'
+        ).encode('ascii')
+        parts.append((header, start, end))
+        total += len(header) + (end - start + 1) + 2
+    closing = f'--{boundary}--\r\n'.encode('ascii')
+    total += len(closing)
+
+    def body():
+        with handle:
+            for header, start, end in parts:
+                yield header
+                yield from _iter_file_range(handle, start, end - start + 1)
+                yield b'\r\n'
+            yield closing
+
+    response = StreamingHttpResponse(
+        body(), status=206, content_type=f'multipart/byteranges; boundary={boundary}'
+    )
+    response['Content-Length'] = str(total)
+    return response
+
+
+def serve_file(request, file_path: str, *, content_type: str | None = None,
+               as_attachment: bool = False, filename: str | None = None):
+    """Return a response that delivers ``file_path`` per MEDIA_SERVE_MODE.
+
+    Handles If-None-Match / If-Modified-Since (304), If-Match /
+    If-Unmodified-Since (412), Range and If-Range. Raises Http404 if the file
+    does not exist.
+    """
+    try:
+        stat_result = os.stat(file_path)
+    except OSError:
+        raise Http404("File not found")
+    if not os.path.isfile(file_path):
+        raise Http404("File not found")
+
+    etag = file_etag(stat_result)
+    last_modified = int(stat_result.st_mtime)
+    filename = filename or os.path.basename(file_path)
+    content_type = content_type or guess_content_type(file_path)
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        return _with_validators(conditional, etag, last_modified)
+
+    mode = getattr(settings, 'MEDIA_SERVE_MODE', SERVE_STREAM)
+
+    if mode == SERVE_X_ACCEL:
+        location = _accel_location(os.path.realpath(file_path))
+        if location is not None:
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = location
+            _set_disposition(response, as_attachment, filename)
+            return _with_validators(response, etag, last_modified)
+    elif mode == SERVE_X_SENDFILE:
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = os.path.realpath(file_path)
+        _set_disposition(response, as_attachment, filename)
+        return _with_validators(response, etag, last_modified)
+
+    try:
+        handle = open(file_path, 'rb')
+    except OSError:
+        raise Http404("File not found")
+
+    size = stat_result.st_size
+    range_header = request.META.get('HTTP_RANGE')
+    ranges = None
+    if range_header and request.method in ('GET', 'HEAD') and _if_range_matches(
+        request, etag, stat_result.st_mtime
+    ):
+        ranges = parse_range_header(range_header, size)
+
+    if ranges == []:
+        handle.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif ranges and len(ranges) == 1:
+        response = _single_range_response(handle, content_type, size, *ranges[0])
+        _set_disposition(response, as_attachment, filename)
+    elif ranges:
+        response = _multi_range_response(handle, content_type, size, ranges)
+        _set_disposition(response, as_attachment, filename)
+    else:
+        response = FileResponse(
+            handle, content_type=content_type, as_attachment=as_attachment, filename=filename
+        )
+
+    response['Accept-Ranges'] = 'bytes'
+    return _with_validators(response, etag, last_modified)
+
+
+def _with_validators(response, etag: str, last_modified: int):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def _set_disposition(response, as_attachment: bool, filename: str) -> None:
+    if as_attachment:
+        response['Content-Disposition'] = content_disposition_header(True, filename)
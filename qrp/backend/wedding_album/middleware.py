@@ -1,5 +1,57 @@
+import contextvars
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
 from django.utils.cache import patch_cache_control
 
+timing_logger = logging.getLogger('wedding_album.timing')
+
+_current_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Counters for one sampled request; see ServerTimingMiddleware."""
+
+    __slots__ = (
+        'db_queries', 'db_time', 'cache_hits', 'cache_misses',
+        'view_start', 'view_end', 'render_start', 'render_end',
+    )
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.view_start = self.view_end = None
+        self.render_start = self.render_end = None
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+def record_cache_lookup(hits, misses):
+    """Count cache hits/misses against the current request, if it is sampled.
+
+    Called by cache backends that set ``reports_lookups`` (see
+    wedding_album.cache_backends).
+    """
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.cache_hits += hits
+        timings.cache_misses += misses
+
+
 class MediaCacheMiddleware:
     """Add cache headers to media files"""
     
@@ -20,3 +72,135 @@ class MediaCacheMiddleware:
             )
         
         return response
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZip responses, except content types that are already compressed.
+
+    Re-compressing ZIP archives, images and videos burns CPU (and, for
+    streamed archives, defeats chunked delivery) for no size benefit.
+    Partial content is never compressed: Content-Range offsets refer to the
+    identity encoding.
+    """
+
+    SKIP_CONTENT_TYPES = (
+        'application/zip', 'application/octet-stream', 'multipart/byteranges',
+        'image/', 'video/', 'audio/',
+    )
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if content_type.startswith(self.SKIP_CONTENT_TYPES) or response.status_code == 206:
+            return response
+        return super().process_response(request, response)
+
+
+class ServerTimingMiddleware:
+    """Per-request timings as a log line and, optionally, a Server-Timing header.
+
+    A SERVER_TIMING_SAMPLE_RATE fraction of requests is measured. For those,
+    it records the DB query count and time (through execute_wrapper), cache
+    hits and misses, view time, response rendering time (DRF's serializer
+    output encoded by the renderer) and the total time spent below this
+    middleware. Other requests pay for one random() call.
+
+    Cache hits and misses come from the default cache backend, so they are
+    only reported when that backend counts them (``reports_lookups``).
+    Otherwise the cache metric is left out rather than shown as zero.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 0.0)
+        self.add_header = getattr(settings, 'SERVER_TIMING_HEADER', settings.DEBUG)
+        self.cache_reports = getattr(caches['default'], 'reports_lookups', False)
+
+    def __call__(self, request):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        request._timings = timings
+        token = _current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        total = time.perf_counter() - start
+
+        if timings.view_start is not None and timings.view_end is None:
+            # No template response: the view ran until the handler returned.
+            timings.view_end = start + total
+
+        metrics = self._metrics(timings, total, self.cache_reports)
+        if self.add_header:
+            response['Server-Timing'] = ', '.join(self._header_parts(metrics))
+        self._log(request, response, metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = getattr(request, '_timings', None)
+        if timings is not None:
+            timings.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timings = getattr(request, '_timings', None)
+        if timings is not None:
+            # The handler renders right after the template-response hooks.
+            timings.view_end = timings.render_start = time.perf_counter()
+
+            def rendered(response):
+                timings.render_end = time.perf_counter()
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def _metrics(timings, total, cache_reports):
+        def span(begin, end):
+            if begin is None or end is None:
+                return None
+            return round((end - begin) * 1000, 2)
+
+        metrics = {
+            'db_queries': timings.db_queries,
+            'db_ms': round(timings.db_time * 1000, 2),
+        }
+        if cache_reports:
+            metrics['cache_hits'] = timings.cache_hits
+            metrics['cache_misses'] = timings.cache_misses
+        metrics['view_ms'] = span(timings.view_start, timings.view_end)
+        metrics['render_ms'] = span(timings.render_start, timings.render_end)
+        metrics['total_ms'] = round(total * 1000, 2)
+        return metrics
+
+    @staticmethod
+    def _header_parts(metrics):
+        yield f'db;dur={metrics["db_ms"]};desc="{metrics["db_queries"]} queries"'
+        if 'cache_hits' in metrics:
+            yield f'cache;desc="{metrics["cache_hits"]} hits, {metrics["cache_misses"]} misses"'
+        if metrics['view_ms'] is not None:
+            yield f'view;dur={metrics["view_ms"]}'
+        if metrics['render_ms'] is not None:
+            yield f'render;dur={metrics["render_ms"]}'
+        yield f'total;dur={metrics["total_ms"]}'
+
+    @staticmethod
+    def _log(request, response, metrics):
+        if not timing_logger.isEnabledFor(logging.INFO):
+            return
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **metrics,
+        }
+        # key=value for grep; the same fields as `extra` for JSON formatters.
+        timing_logger.info(
+            ' '.join(f'{key}={value}' for key, value in fields.items()),
+            extra={'timing': fields},
+        )
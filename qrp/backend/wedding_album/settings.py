@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -33,6 +34,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'wedding_album.middleware.ServerTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -42,7 +44,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'wedding_album.middleware.MediaCacheMiddleware',
-    'django.middleware.gzip.GZipMiddleware',
+    'wedding_album.middleware.SelectiveGZipMiddleware',
 ]
 
 ROOT_URLCONF = 'wedding_album.urls'
@@ -94,6 +96,12 @@ STATIC_ROOT = '/app/staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# How media downloads are delivered (see wedding_album/file_serving.py):
+# 'stream' (FileResponse/sendfile), 'x-accel' (nginx X-Accel-Redirect to the
+# internal MEDIA_ACCEL_REDIRECT_PREFIX location) or 'x-sendfile'.
+MEDIA_SERVE_MODE = os.environ.get('MEDIA_SERVE_MODE', 'stream').lower()
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
 # File upload settings - optimized for large image uploads
 FILE_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB - keep images in memory
 DATA_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024 * 1024  # 1GB
@@ -102,20 +110,104 @@ FILE_UPLOAD_HANDLERS = [
     'django.core.files.uploadhandler.TemporaryFileUploadHandler',
 ]
 
+# Image processing engine: a process pool shared by all requests in a server
+# process. 0 workers runs jobs inline on the calling thread.
+IMAGE_ENGINE_WORKERS = int(os.environ.get('IMAGE_ENGINE_WORKERS', os.cpu_count() or 1))
+# Maximum jobs in flight (queued + running) before submitters block.
+IMAGE_ENGINE_MAX_PENDING = int(os.environ.get('IMAGE_ENGINE_MAX_PENDING', max(1, IMAGE_ENGINE_WORKERS) * 2))
+
+# Asynchronous upload jobs (?async=1 on the upload endpoints). Jobs are stored
+# in the database; by default a background thread in the web process drains
+# them. Set UPLOAD_JOBS_IN_PROCESS_WORKER=false when running the dedicated
+# `manage.py process_upload_jobs` worker instead.
+UPLOAD_JOBS_IN_PROCESS_WORKER = os.environ.get('UPLOAD_JOBS_IN_PROCESS_WORKER', 'true').lower() == 'true'
+UPLOAD_JOBS_POLL_INTERVAL = int(os.environ.get('UPLOAD_JOBS_POLL_INTERVAL', 5))
+# Jobs without progress for this long are assumed abandoned and re-queued.
+UPLOAD_JOBS_STALE_AFTER = int(os.environ.get('UPLOAD_JOBS_STALE_AFTER', 15 * 60))
+
+# Stored files are deleted through a database queue (albums/media_deletions.py).
+# By default a background thread in the web process drains it; set
+# MEDIA_DELETIONS_IN_PROCESS_WORKER=false when running the dedicated
+# `manage.py process_media_deletions` worker instead.
+MEDIA_DELETIONS_IN_PROCESS_WORKER = os.environ.get('MEDIA_DELETIONS_IN_PROCESS_WORKER', 'true').lower() == 'true'
+MEDIA_DELETIONS_POLL_INTERVAL = int(os.environ.get('MEDIA_DELETIONS_POLL_INTERVAL', 30))
+MEDIA_DELETION_BATCH_SIZE = int(os.environ.get('MEDIA_DELETION_BATCH_SIZE', 200))
+# Failed deletes are retried with backoff, then left in the table for inspection.
+MEDIA_DELETION_MAX_ATTEMPTS = int(os.environ.get('MEDIA_DELETION_MAX_ATTEMPTS', 8))
+
+# Buffer photo like/unlike toggles in memory and write them in batches
+# (see albums/likes.py). Useful when many guests like photos at once. The
+# buffer is per process: only enable this with a single gunicorn worker.
+PHOTO_LIKE_BATCHING = os.environ.get('PHOTO_LIKE_BATCHING', 'false').lower() == 'true'
+PHOTO_LIKE_FLUSH_INTERVAL = float(os.environ.get('PHOTO_LIKE_FLUSH_INTERVAL', 0.5))
+PHOTO_LIKE_FLUSH_BATCH = int(os.environ.get('PHOTO_LIKE_FLUSH_BATCH', 500))
+
+# Album ZIP downloads are cached under MEDIA_ROOT/archives and rebuilt in the
+# background once an album's photos have stopped changing for this long.
+ALBUM_ARCHIVE_CACHE = os.environ.get('ALBUM_ARCHIVE_CACHE', 'true').lower() == 'true'
+ALBUM_ARCHIVE_SETTLE_SECONDS = int(os.environ.get('ALBUM_ARCHIVE_SETTLE_SECONDS', 60))
+# A build holds a lock in the shared cache so only one worker writes an archive.
+ALBUM_ARCHIVE_BUILD_LOCK_SECONDS = int(os.environ.get('ALBUM_ARCHIVE_BUILD_LOCK_SECONDS', 30 * 60))
+
+# Studio landing page snapshot lifetime. Edits invalidate it immediately
+# through model signals, so this only bounds how long an unchanged copy lives.
+STUDIO_DATA_CACHE_TIMEOUT = int(os.environ.get('STUDIO_DATA_CACHE_TIMEOUT', 24 * 60 * 60))
+
 # Cache settings
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-        'OPTIONS': {
-            'MAX_ENTRIES': 2000
+# The default cache is a SQLite file shared by every worker process on the
+# host (wedding_album/cache_backends.py), so throttles, the studio snapshot
+# and invalidations are consistent across gunicorn workers. Set
+# DJANGO_CACHE_BACKEND=locmem for a per-process in-memory cache instead.
+if os.environ.get('DJANGO_CACHE_BACKEND', 'sqlite').lower() == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'wedding_album.cache_backends.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+            'OPTIONS': {
+                'MAX_ENTRIES': 2000
+            }
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'wedding_album.cache_backends.SQLiteCache',
+            'LOCATION': os.environ.get(
+                'DJANGO_CACHE_LOCATION',
+                os.path.join(tempfile.gettempdir(), 'wedding_album_cache.sqlite3'),
+            ),
+            'OPTIONS': {
+                'MAX_ENTRIES': 20000
+            }
         }
     }
-}
 
 # Cache timeout (in seconds)
 CACHE_MIDDLEWARE_SECONDS = 300  # 5 minutes
 
+# Request timing (wedding_album.middleware.ServerTimingMiddleware). This
+# fraction of requests gets DB, cache, view and render timings as a log line
+# on the 'wedding_album.timing' logger. 0 turns it off. The Server-Timing
+# response header exposes the same numbers to clients, so it is only sent by
+# default under DEBUG.
+SERVER_TIMING_SAMPLE_RATE = float(os.environ.get('SERVER_TIMING_SAMPLE_RATE', '1.0' if DEBUG else '0.05'))
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'true' if DEBUG else 'false').lower() == 'true'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'wedding_album.timing': {
+            'handlers': ['console'],
+            'level': os.environ.get('SERVER_TIMING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Security settings for production
 if not DEBUG:
     SECURE_SSL_REDIRECT = os.environ.get('DJANGO_SECURE_SSL_REDIRECT', 'true').lower() == 'true'
@@ -146,6 +238,54 @@ else:
     # Also use whitenoise in development for consistency
     MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
 
+# Media storage. 'local' keeps uploads in MEDIA_ROOT. 's3' stores them in an
+# S3-compatible bucket through django-storages (pip install
+# "django-storages[s3]"), so several app nodes can share media without a
+# shared filesystem. Set AWS_S3_ENDPOINT_URL for MinIO or other S3-compatible
+# services.
+MEDIA_STORAGE = os.environ.get('MEDIA_STORAGE', 'local').lower()
+if MEDIA_STORAGE == 's3':
+    AWS_STORAGE_BUCKET_NAME = os.environ['AWS_STORAGE_BUCKET_NAME']
+    AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL') or None
+    AWS_S3_REGION_NAME = os.environ.get('AWS_S3_REGION_NAME') or None
+    AWS_S3_CUSTOM_DOMAIN = os.environ.get('AWS_S3_CUSTOM_DOMAIN') or None
+    AWS_LOCATION = os.environ.get('AWS_LOCATION', 'media')
+    STORAGES = {
+        'default': {
+            'BACKEND': 'storages.backends.s3.S3Storage',
+            'OPTIONS': {
+                'bucket_name': AWS_STORAGE_BUCKET_NAME,
+                'endpoint_url': AWS_S3_ENDPOINT_URL,
+                'region_name': AWS_S3_REGION_NAME,
+                'access_key': os.environ.get('AWS_ACCESS_KEY_ID'),
+                'secret_key': os.environ.get('AWS_SECRET_ACCESS_KEY'),
+                'custom_domain': AWS_S3_CUSTOM_DOMAIN,
+                'location': AWS_LOCATION,
+                # Public, unsigned URLs: photo URLs are stored in the database.
+                'querystring_auth': False,
+                'file_overwrite': False,
+                'addressing_style': 'path' if AWS_S3_ENDPOINT_URL else None,
+            },
+        },
+        # STORAGES replaces STATICFILES_STORAGE; keep the static files backend.
+        'staticfiles': {
+            'BACKEND': globals().pop(
+                'STATICFILES_STORAGE', 'django.contrib.staticfiles.storage.StaticFilesStorage'
+            ),
+        },
+    }
+    # Stored photo URLs are matched against MEDIA_URL to find their files.
+    if AWS_S3_CUSTOM_DOMAIN:
+        _media_base = f"https://{AWS_S3_CUSTOM_DOMAIN}"
+    elif AWS_S3_ENDPOINT_URL:
+        _media_base = f"{AWS_S3_ENDPOINT_URL.rstrip('/')}/{AWS_STORAGE_BUCKET_NAME}"
+    else:
+        _media_base = f"https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com"
+    MEDIA_URL = os.environ.get('MEDIA_URL', f"{_media_base}/{AWS_LOCATION}/" if AWS_LOCATION else f"{_media_base}/")
+
+# Threads per process that write uploaded album images to storage.
+MEDIA_STORAGE_WRITE_WORKERS = int(os.environ.get('MEDIA_STORAGE_WRITE_WORKERS', 8))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ALLOWED_ORIGINS = [
@@ -219,6 +359,16 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@robelstudio.com')
 ADMIN_EMAIL = os.getenv('ADMIN_EMAIL', 'admin@robelstudio.com')
 
+# Outgoing mail is queued in the database (albums/outbox.py) and sent in
+# batches over one connection. By default a background thread in the web
+# process sends it; set OUTBOX_IN_PROCESS_WORKER=false when running the
+# dedicated `manage.py send_outbox` worker instead.
+OUTBOX_IN_PROCESS_WORKER = os.getenv('OUTBOX_IN_PROCESS_WORKER', 'true').lower() == 'true'
+OUTBOX_POLL_INTERVAL = int(os.getenv('OUTBOX_POLL_INTERVAL', 60))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 50))
+# Failed sends are retried with backoff, then left in the table for inspection.
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 8))
+
 # For development, use console backend if no email credentials
 # if DEBUG and not EMAIL_HOST_USER:
 #     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'